@@ -0,0 +1,191 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pre_processings"))
+sys.path.insert(0, ROOT)
+
+from drop_generation import model_dimensions, place_orientations
+from energy_history import check_energy, open_history
+from keyword_index import KeywordIndex
+from support_index import SupportIndex
+from synthetic import write_deck, write_history
+from system_model import load_nodes, read_nodes
+from tie_checks import find_tie_issues, iter_tie_pairs
+
+# 前/后处理热点的基准测试（不需要界面）:
+#   parse         read_nodes（read_system_model 的解析部分，不使用缓存）
+#   parse_cached  load_nodes 命中缓存（memory-map）
+#   placement     place_orientations（run_simulation 的方向循环），逐个节点扫描
+#   placement_indexed  同上，使用预先建立的支撑点索引（建立时间单独计为 support_index）
+#   ties          iter_tie_pairs + find_tie_issues（check_duplicates_and_swaps）
+#   ties_indexed  同上，通过预先建立的关键字索引直接读取 *tie 块
+#   energy        check_energy 读取 .npz 能量历史并检查 5% 阈值
+# 每个规模先计时（取 --repeat 次中最快的一次），再单独运行一次用 tracemalloc 记录峰值内存。
+#   python benchmarks/run_benchmarks.py --sizes 10000,100000,1000000 --output results.json
+#   python benchmarks/run_benchmarks.py --sizes 100000 --compare results.json --tolerance 0.25
+BENCHMARKS = ("parse", "parse_cached", "support_index", "placement", "placement_indexed", "ties",
+              "ties_indexed", "energy")
+
+
+def _orientations(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([np.arange(1, count + 1), rng.uniform(-180, 180, (count, 3))])
+
+
+def prepare(work_dir, size, args):
+    # 每个规模的输入文件和共享的中间结果
+    deck = os.path.join(work_dir, f"deck_{size}.txt")
+    history = os.path.join(work_dir, f"history_{size}.npz")
+    info = write_deck(deck, size, max(size // args.nodes_per_tie, 1), args.node_blocks, args.comment_density)
+    write_history(history, size, args.regions)
+    nodes, _ = read_nodes(deck)
+    coords = nodes[:, 1:4]
+    _, _, _, o = model_dimensions(coords)
+    return {"deck": deck, "history": history, "deck_bytes": info["bytes"], "ties": info["ties"],
+            "history_bytes": os.path.getsize(history), "coords": coords, "center": o,
+            "orientations": _orientations(args.orientations), "cache_dir": os.path.join(work_dir, f"cache_{size}"),
+            "index": SupportIndex.build(coords), "keywords": KeywordIndex.build(deck)}
+
+
+def bench_function(name, data):
+    # 返回 (无参数函数, 处理量, 单位)
+    if name == "parse":
+        return lambda: read_nodes(data["deck"]), data["deck_bytes"], "bytes"
+    if name == "parse_cached":
+        load_nodes(data["deck"], cache_dir=data["cache_dir"])  # 写入缓存
+        return lambda: load_nodes(data["deck"], cache_dir=data["cache_dir"]), data["deck_bytes"], "bytes"
+    if name == "support_index":
+        return lambda: SupportIndex.build(data["coords"]), len(data["coords"]), "nodes"
+    if name == "placement":
+        return (lambda: place_orientations(data["coords"], data["center"].copy(), data["orientations"], 5.0),
+                len(data["coords"]) * len(data["orientations"]), "node-orientations")
+    if name == "placement_indexed":
+        return (lambda: place_orientations(data["coords"], data["center"].copy(), data["orientations"], 5.0,
+                                           data["index"]),
+                len(data["coords"]) * len(data["orientations"]), "node-orientations")
+    if name == "ties":
+        return lambda: find_tie_issues(iter_tie_pairs(data["deck"])), data["ties"], "pairs"
+    if name == "ties_indexed":
+        return lambda: find_tie_issues(iter_tie_pairs(data["deck"], index=data["keywords"])), data["ties"], "pairs"
+    if name == "energy":
+        def run():
+            history = open_history(data["history"])
+            try:
+                return check_energy(history, steps=None, regions=None, keep_series=False)
+            finally:
+                history.close()
+        return run, data["history_bytes"], "bytes"
+    raise ValueError(f"Unknown benchmark '{name}'")
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def scaling_exponents(results):
+    # log(seconds) 对 log(size) 的斜率：1 为线性，2 为平方
+    exponents = {}
+    for name in {r["benchmark"] for r in results}:
+        points = sorted((r["size"], r["seconds"]) for r in results if r["benchmark"] == name and r["seconds"] > 0)
+        if len(points) > 1:
+            sizes, seconds = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+            exponents[name] = float(np.polyfit(sizes, seconds, 1)[0])
+    return exponents
+
+
+def compare(results, baseline_path, tolerance):
+    # 返回比基准慢 tolerance 以上的 (benchmark, size, seconds, baseline_seconds)
+    with open(baseline_path, "r") as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get((r["benchmark"], r["size"]))
+        if base and r["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append((r["benchmark"], r["size"], r["seconds"], base["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark node parsing, placement, tie checks and energy checks.")
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated node counts (default: 10000,100000)")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the fastest is kept")
+    parser.add_argument("--orientations", type=int, default=25, help="orientations for the placement benchmarks")
+    parser.add_argument("--node-blocks", type=int, default=4)
+    parser.add_argument("--comment-density", type=float, default=0.01)
+    parser.add_argument("--nodes-per-tie", type=int, default=100, help="tie pairs = nodes / this")
+    parser.add_argument("--regions", type=int, default=2, help="history regions in the energy benchmark")
+    parser.add_argument("--work-dir", help="keep the generated inputs here (default: a temporary directory)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="ai-cae-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for size in sizes:
+            data = prepare(work_dir, size, args)
+            for name in names:
+                func, amount, unit = bench_function(name, data)
+                seconds, peak = measure(func, args.repeat)
+                results.append({"benchmark": name, "size": size, "seconds": seconds, "amount": amount,
+                                "unit": unit, "throughput": amount / seconds if seconds > 0 else None,
+                                "peak_mb": peak / 1024 ** 2})
+                print(f"{name:18s} {size:>10d}  {seconds * 1000:10.2f} ms  "
+                      f"{amount / seconds / 1e6 if seconds > 0 else float('inf'):10.2f} M{unit}/s  "
+                      f"peak {peak / 1024 ** 2:8.1f} MB")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    exponents = scaling_exponents(results)
+    for name, exponent in sorted(exponents.items()):
+        print(f"scaling {name}: time ~ size^{exponent:.2f}")
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "numpy": np.__version__, "machine": platform.platform(), "cpus": os.cpu_count(),
+              "results": results, "scaling": exponents}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for name, size, seconds, base in regressions:
+            print(f"REGRESSION {name} at {size}: {seconds * 1000:.2f} ms vs {base * 1000:.2f} ms "
+                  f"(+{(seconds / base - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance * 100:.0f}% against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
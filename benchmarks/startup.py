@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import write_deck, write_history
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRE = os.path.join(ROOT, "pre_processings")
+
+# 命令行工具的启动时间检查：每个工具在新的解释器中运行（取 --repeat 次中最快的一次），
+# 超过目标时间、或加载了不需要的界面/绘图模块时返回 1，可以放在作业脚本或 CI 中:
+#   python benchmarks/startup.py
+#   python benchmarks/startup.py --max-seconds 0.5 --output startup.json
+# 目标时间为工具本身的时间（已减去空解释器的启动时间）。参考机器上 numpy 导入约 0.12 s，
+# 无界面的 tie 检查和能量检查约 0.15 s；tkinter、matplotlib.pyplot、scipy.spatial 分别约 0.02、0.75、0.3 s。
+MAX_SECONDS = 0.3
+HEAVY = ("tkinter", "matplotlib", "scipy", "mpl_toolkits")
+
+# 在子进程中以 __main__ 运行脚本（run_name 不是 __main__ 时只导入），然后报告加载了哪些重模块
+_RUNNER = """
+import json, os, runpy, sys, time
+start = time.perf_counter()
+path, run_name, heavy = sys.argv[1], sys.argv[2], sys.argv[3].split(",")
+sys.argv = [path] + sys.argv[4:]
+sys.path.insert(0, os.path.dirname(path))
+code = 0
+try:
+    runpy.run_path(path, run_name=run_name)
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(heavy))
+sys.__stdout__.write("\\n" + json.dumps({"code": code, "loaded": loaded, "seconds": time.perf_counter() - start}))
+"""
+
+
+def tool_cases(work_dir):
+    # (名称, 脚本, run_name, 参数, 允许的返回值, 不允许加载的模块)
+    deck = os.path.join(work_dir, "deck.txt")
+    history = os.path.join(work_dir, "history.npz")
+    write_deck(deck, nodes=2000, ties=200)
+    write_history(history, samples=10000)
+    return [
+        ("tie_check", os.path.join(PRE, "tie_corrections.py"), "__main__", [deck], (0, 1), HEAVY),
+        ("tie_checks", os.path.join(PRE, "tie_checks.py"), "__main__", [deck], (0, 1), HEAVY),
+        ("post_processing", os.path.join(ROOT, "post-processing"), "__main__", [history, "--no-plot"], (0, 1),
+         HEAVY + ("render",)),
+        ("energy_batch", os.path.join(ROOT, "energy_batch.py"), "__main__",
+         [history, "--summary", os.path.join(work_dir, "summary.csv")], (0, 1), HEAVY),
+        ("drop_batch_help", os.path.join(PRE, "drop_batch.py"), "__main__", ["--help"], (0,), HEAVY),
+        # 界面程序只导入，不打开窗口
+        ("tie_gui_import", os.path.join(PRE, "tie_corrections.py"), "startup_check", [], (0,), HEAVY),
+        ("orientation_gui_import", os.path.join(PRE, "orientation-generations.py"), "startup_check", [], (0,),
+         HEAVY),
+    ]
+
+
+def run_once(path, run_name, args, heavy, env):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", _RUNNER, path, run_name, ",".join(heavy)] + list(args),
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, cwd=os.path.dirname(path))
+    seconds = time.perf_counter() - start
+    lines = proc.stdout.decode(errors="replace").strip().splitlines()
+    try:
+        info = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        info = {"code": proc.returncode, "loaded": [], "error": proc.stderr.decode(errors="replace").strip()[-500:]}
+    info["wall_seconds"] = seconds
+    return info
+
+
+def interpreter_seconds(repeat, env):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check command-line startup time and that GUI/plotting modules "
+                                                 "are not loaded by headless runs.")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS,
+                        help=f"startup budget per tool, excluding the bare interpreter (default: {MAX_SECONDS})")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per tool, the fastest is kept")
+    parser.add_argument("--only", help="comma-separated subset of tool names")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    failures = []
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ai-cae-startup-") as work_dir:
+        env = dict(os.environ, AI_CAE_CACHE_DIR=os.path.join(work_dir, "cache"), MPLBACKEND="Agg")
+        base = interpreter_seconds(args.repeat, env)
+        print(f"{'interpreter':24s} {base * 1000:8.1f} ms")
+        cases = tool_cases(work_dir)
+        if args.only:
+            cases = [case for case in cases if case[0] in args.only.split(",")]
+        for name, path, run_name, tool_args, codes, heavy in cases:
+            runs = [run_once(path, run_name, tool_args, heavy, env) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["wall_seconds"])
+            seconds = best["wall_seconds"] - base
+            problems = []
+            if any(r["code"] not in codes for r in runs):
+                problems.append(f"exit code {best['code']}" + (f": {best['error']}" if best.get("error") else ""))
+            loaded = sorted({module for r in runs for module in r["loaded"]})
+            if loaded:
+                problems.append("loaded " + ", ".join(loaded))
+            if seconds > args.max_seconds:
+                problems.append(f"over the {args.max_seconds * 1000:.0f} ms budget")
+            results.append({"tool": name, "seconds": seconds, "wall_seconds": best["wall_seconds"],
+                            "loaded": loaded, "problems": problems})
+            print(f"{name:24s} {seconds * 1000:8.1f} ms  " + ("; ".join(problems) if problems else "ok"))
+            failures.extend(f"{name}: {problem}" for problem in problems)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "interpreter_seconds": base,
+                       "max_seconds": args.max_seconds, "results": results}, f, indent=1)
+    if failures:
+        print(f"{len(failures)} startup problem(s)")
+        return 1
+    print(f"All tools start within {args.max_seconds * 1000:.0f} ms without GUI or plotting modules")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
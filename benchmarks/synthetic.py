@@ -0,0 +1,126 @@
+import argparse
+import os
+
+import numpy as np
+
+# 生成基准测试用的合成数据：
+#   deck     *node 块（节点分布在类似手机的长方体表面和内部）+ *element 占位 + *tie 块（含重复和交换的对）
+#   history  与 energy_history.ArrayHistory 兼容的 .npz 能量历史（可在指定位置开始超标）
+#   python synthetic.py deck model.txt --nodes 1000000 --ties 5000 --node-blocks 4 --comment-density 0.01
+#   python synthetic.py history job.npz --samples 1000000 --regions 2 --exceed-at 0.9
+
+
+def box_nodes(count, size=(150.0, 75.0, 8.0), surface=0.8, seed=0):
+    # surface 比例的节点在长方体表面上，其余在内部
+    rng = np.random.default_rng(seed)
+    size = np.asarray(size)
+    coords = rng.random((count, 3)) * size
+    on_surface = rng.random(count) < surface
+    axis = rng.integers(0, 3, count)
+    rows = np.flatnonzero(on_surface)
+    coords[rows, axis[rows]] = np.where(rng.random(len(rows)) < 0.5, 0.0, size[axis[rows]])
+    return coords
+
+
+def _write_lines(f, lines, comment_every):
+    if comment_every:
+        for start in range(0, len(lines), comment_every):
+            f.write("\n".join(lines[start:start + comment_every]))
+            f.write("\n** synthetic comment\n")
+    elif lines:
+        f.write("\n".join(lines))
+        f.write("\n")
+
+
+def write_deck(path, nodes=100000, ties=1000, node_blocks=1, comment_density=0.0, duplicate_rate=0.02,
+               seed=0):
+    # 返回 {"nodes", "ties", "duplicates", "swaps", "bytes"}，duplicates / swaps 为写入的重复和交换对数
+    rng = np.random.default_rng(seed)
+    coords = box_nodes(nodes, seed=seed)
+    comment_every = int(round(1 / comment_density)) if comment_density > 0 else 0
+    bounds = np.linspace(0, nodes, max(node_blocks, 1) + 1).astype(np.int64)
+    duplicates = swaps = 0
+    with open(path, "w") as f:
+        f.write("*heading\nsynthetic benchmark deck\n")
+        for b in range(len(bounds) - 1):
+            f.write(f"*node, nset=block_{b}\n")
+            lines = [f"{i + 1}, {x:.6f}, {y:.6f}, {z:.6f}"
+                     for i, (x, y, z) in zip(range(bounds[b], bounds[b + 1]), coords[bounds[b]:bounds[b + 1]])]
+            _write_lines(f, lines, comment_every)
+            f.write("*element, type=C3D8R, elset=block_{0}\n** elements omitted\n".format(b))
+
+        # 每个 *tie 块约 50 对，按 duplicate_rate 混入重复和交换的对
+        pairs_per_tie = 50
+        written = 0
+        t = 0
+        while written < ties:
+            f.write(f"*tie, name=tie_{t}, adjust=no\n")
+            lines = []
+            block = []
+            for _ in range(min(pairs_per_tie, ties - written)):
+                if block and rng.random() < duplicate_rate:
+                    a, b = block[rng.integers(len(block))]
+                    if rng.random() < 0.5:
+                        lines.append(f"{a}, {b}")
+                        duplicates += 1
+                    else:
+                        lines.append(f"{b}, {a}")
+                        swaps += 1
+                else:
+                    block.append((f"surf_{t}_{len(block)}_a", f"surf_{t}_{len(block)}_b"))
+                    lines.append(f"{block[-1][0]}, {block[-1][1]}")
+                written += 1
+            _write_lines(f, lines, comment_every)
+            t += 1
+        f.write("*end step\n")
+    return {"nodes": nodes, "ties": ties, "duplicates": duplicates, "swaps": swaps, "bytes": os.path.getsize(path)}
+
+
+def write_history(path, samples=100000, regions=1, steps=1, exceed_at=None, seed=0):
+    # ETOTAL 从 0 逐渐增大到稳定值，ALLAE 约为其 1%；exceed_at 为 0~1 之间的时间比例，之后 ALLAE 超过 5%
+    rng = np.random.default_rng(seed)
+    arrays = {}
+    for s in range(steps):
+        time = np.linspace(0.0, 1.0, samples)
+        etotal = 1000.0 * (1 - np.exp(-20 * time)) + 1.0
+        for r in range(regions):
+            region = "Assembly ASSEMBLY" if r == 0 else f"Region-{r}"
+            allae = etotal * (0.01 + 0.002 * rng.random(samples))
+            if exceed_at is not None:
+                allae[time >= exceed_at] = etotal[time >= exceed_at] * 0.08
+            arrays[f"Step-{s + 1}|{region}|ALLAE"] = np.column_stack([time, allae])
+            arrays[f"Step-{s + 1}|{region}|ETOTAL"] = np.column_stack([time, etotal])
+    np.savez(path, **arrays)
+    return {"samples": samples, "regions": regions, "steps": steps, "bytes": os.path.getsize(path)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic decks and energy histories for benchmarks.")
+    sub = parser.add_subparsers(dest="kind", required=True)
+    deck = sub.add_parser("deck", help="system model deck with *node and *tie blocks")
+    deck.add_argument("path")
+    deck.add_argument("--nodes", type=int, default=100000)
+    deck.add_argument("--ties", type=int, default=1000)
+    deck.add_argument("--node-blocks", type=int, default=1)
+    deck.add_argument("--comment-density", type=float, default=0.0, help="comment lines per data line")
+    deck.add_argument("--duplicate-rate", type=float, default=0.02, help="fraction of duplicated/swapped tie pairs")
+    deck.add_argument("--seed", type=int, default=0)
+    history = sub.add_parser("history", help="energy history .npz")
+    history.add_argument("path")
+    history.add_argument("--samples", type=int, default=100000)
+    history.add_argument("--regions", type=int, default=1)
+    history.add_argument("--steps", type=int, default=1)
+    history.add_argument("--exceed-at", type=float, help="time fraction after which ALLAE exceeds 5%% of ETOTAL")
+    history.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.kind == "deck":
+        info = write_deck(args.path, args.nodes, args.ties, args.node_blocks, args.comment_density,
+                          args.duplicate_rate, args.seed)
+    else:
+        info = write_history(args.path, args.samples, args.regions, args.steps, args.exceed_at, args.seed)
+    print(f"Wrote {args.path}: " + ", ".join(f"{key}={value}" for key, value in info.items()))
+
+
+if __name__ == "__main__":
+    main()
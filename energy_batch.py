@@ -0,0 +1,166 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from energy_history import CHUNK_SIZE, DEFAULT_REGIONS, DEFAULT_STEPS, check_energy, open_history
+
+# 批量检查所有跌落方向的计算结果，输出一个汇总表（每个方向的最大 ALLAE/ETOTAL、第一次超标时间、是否通过）
+#   python energy_batch.py results/ --jobs 16 --summary energy_summary.csv
+#   python energy_batch.py "results/*_ori_*.odb" --all-steps --stop-on-exceed
+# 文件名中的 _ori_<id>_<xn>_<yn>_<zn> 与 run_simulation 生成的计算文件名一致，据此对应回跌落方向
+RESULT_EXTENSIONS = (".odb", ".npz", ".csv")
+_ORIENTATION = re.compile(r"^(.*)_ori_([^_]+)(?:_(-?[\d.]+)_(-?[\d.]+)_(-?[\d.]+))?")
+SUMMARY_FIELDS = ("product", "orientation", "xn", "yn", "zn", "passed", "regions_checked", "max_ratio",
+                  "max_ratio_time", "first_exceedance_time", "first_exceedance_step", "first_exceedance_region",
+                  "exceedances", "error", "seconds", "file")
+
+
+def find_results(patterns):
+    # 目录（其中的 .odb/.npz/.csv）、通配符或文件，去重后按文件名排序
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                       if name.lower().endswith(RESULT_EXTENSIONS)]
+        else:
+            matches = glob.glob(pattern) or ([pattern] if os.path.exists(pattern) else [])
+        files.extend(os.path.abspath(path) for path in matches)
+    return sorted(set(files), key=lambda path: (os.path.basename(path), path))
+
+
+def orientation_of(path):
+    # "phone_init_ori_3_0.00_-1.00_0.00.odb" -> ("phone_init", "3", (0.0, -1.0, 0.0))
+    name = os.path.splitext(os.path.basename(path))[0]
+    m = _ORIENTATION.match(name)
+    if not m:
+        return name, None, None
+    angle = None
+    if m.group(3) is not None:
+        try:
+            angle = tuple(float(v) for v in m.group(3, 4, 5))
+        except ValueError:
+            angle = None
+    return m.group(1), m.group(2), angle
+
+
+def check_result(path, steps=DEFAULT_STEPS, regions=DEFAULT_REGIONS, threshold=0.05, chunk_size=CHUNK_SIZE,
+                 stop_on_exceed=False):
+    # 一个结果文件的汇总行；出错时 passed 为 False 并记录 error
+    start = time.perf_counter()
+    product, orientation, angle = orientation_of(path)
+    row = dict.fromkeys(SUMMARY_FIELDS)
+    row.update(product=product, orientation=orientation, file=path, passed=False, regions_checked=0, exceedances=0)
+    if angle is not None:
+        row["xn"], row["yn"], row["zn"] = angle
+    try:
+        history = open_history(path)
+        try:
+            result = check_energy(history, steps, regions, threshold, chunk_size=chunk_size,
+                                  stop_on_exceed=stop_on_exceed, keep_series=False)
+        finally:
+            history.close()
+        # 没有检查任何能量历史的结果不算通过（check_energy 此时已记录错误）
+        row.update(passed=result["passed"] and result["checked"] > 0, regions_checked=result["checked"],
+                   max_ratio=result["max_ratio"], exceedances=result["exceedances"],
+                   error="; ".join(result["errors"]) or None)
+        if result["max_ratio_at"] is not None:
+            row["max_ratio_time"] = result["max_ratio_at"][2]
+        if result["first_exceedance"] is not None:
+            (row["first_exceedance_step"], row["first_exceedance_region"],
+             row["first_exceedance_time"]) = result["first_exceedance"]
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def _orientation_key(row):
+    orientation = row["orientation"]
+    try:
+        return row["product"], 0, float(orientation), ""
+    except (TypeError, ValueError):
+        return row["product"], 1, 0.0, str(orientation)
+
+
+def run_checks(paths, workers=1, log=print, **options):
+    # 返回按产品、方向编号排序的汇总行
+    if workers <= 1 or len(paths) <= 1:
+        rows = []
+        for path in paths:
+            rows.append(check_result(path, **options))
+            log(format_row(rows[-1]))
+    else:
+        for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ.setdefault(var, "1")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(check_result, path, **options) for path in paths]
+            rows = []
+            for future in futures:
+                rows.append(future.result())
+                log(format_row(rows[-1]))
+    return sorted(rows, key=_orientation_key)
+
+
+def format_row(row):
+    name = os.path.basename(row["file"])
+    if row["passed"]:
+        return f"{name}: passed, max ratio {row['max_ratio'] * 100:.2f}%"
+    if row["exceedances"]:
+        return (f"{name}: FAILED, max ratio {row['max_ratio'] * 100:.2f}%, first exceedance at time "
+                f"{row['first_exceedance_time']:.4f} ({row['first_exceedance_step']})")
+    return f"{name}: ERROR {row['error']}"
+
+
+def write_summary(rows, summary_path):
+    # .json 为列表，其他按 CSV 写出
+    if summary_path.lower().endswith(".json"):
+        with open(summary_path, "w") as f:
+            json.dump(rows, f, indent=1)
+        return
+    with open(summary_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: "" if value is None else value for key, value in row.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check hourglass energy of many orientation results in parallel.")
+    parser.add_argument("results", nargs="+", help="result directories, glob patterns or files (.odb/.npz/.csv)")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--summary", default="energy_summary.csv", help="summary file, .csv or .json")
+    parser.add_argument("--step", action="append", help=f"step to check, repeatable (default: {DEFAULT_STEPS[0]})")
+    parser.add_argument("--region", action="append",
+                        help=f"history region to check, repeatable (default: {DEFAULT_REGIONS[0]})")
+    parser.add_argument("--all-steps", action="store_true", help="check every step")
+    parser.add_argument("--all-regions", action="store_true", help="check every region with ALLAE and ETOTAL")
+    parser.add_argument("--threshold", type=float, default=0.05, help="allowed ALLAE/ETOTAL ratio (default: 0.05)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="samples read per chunk")
+    parser.add_argument("--stop-on-exceed", action="store_true",
+                        help="stop reading a result at its first exceedance (max ratio then covers only the part read)")
+    args = parser.parse_args(argv)
+
+    paths = find_results(args.results)
+    if not paths:
+        parser.error("no result files found")
+    start = time.perf_counter()
+    rows = run_checks(paths, args.jobs,
+                      steps=None if args.all_steps else (args.step or DEFAULT_STEPS),
+                      regions=None if args.all_regions else (args.region or DEFAULT_REGIONS),
+                      threshold=args.threshold, chunk_size=args.chunk_size, stop_on_exceed=args.stop_on_exceed)
+    write_summary(rows, args.summary)
+    failed = [row for row in rows if not row["passed"]]
+    print(f"{len(rows) - len(failed)}/{len(rows)} results passed in {time.perf_counter() - start:.2f} s "
+          f"using {args.jobs} worker(s); summary written to {args.summary}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
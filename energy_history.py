@@ -0,0 +1,233 @@
+import csv
+import os
+
+import numpy as np
+
+# 能量历史输出的读取和检查。数据来源可以是:
+#   OdbHistory    Abaqus ODB（需要在 Abaqus Python 中运行，odbAccess 按需导入）
+#   ArrayHistory  导出的 .npz（键为 "step|region|output"，值为 (n, 2) 的 time, value）
+#                 或 .csv（列为 step, region, time, ALLAE, ETOTAL, ...）
+# 两者接口相同：steps() / regions(step) / outputs(step, region) / length(...) / read(..., start, stop)
+DEFAULT_STEPS = ("Step-1",)
+DEFAULT_REGIONS = ("Assembly ASSEMBLY",)
+CHUNK_SIZE = 1000000
+MAX_EXAMPLES = 20
+
+
+class OdbHistory:
+    def __init__(self, path):
+        from odbAccess import openOdb
+        self.path = path
+        self.odb = openOdb(path, readOnly=True)
+        self._data = {}
+
+    def steps(self):
+        return list(self.odb.steps.keys())
+
+    def regions(self, step):
+        return list(self.odb.steps[step].historyRegions.keys())
+
+    def outputs(self, step, region):
+        return list(self.odb.steps[step].historyRegions[region].historyOutputs.keys())
+
+    def _output_data(self, step, region, output):
+        # .data 每次访问都会重新生成整个 tuple，只取一次
+        key = (step, region, output)
+        if key not in self._data:
+            self._data[key] = self.odb.steps[step].historyRegions[region].historyOutputs[output].data
+        return self._data[key]
+
+    def length(self, step, region, output):
+        return len(self._output_data(step, region, output))
+
+    def read(self, step, region, output, start=0, stop=None):
+        # 整段一次转换为 (n, 2) 数组，不逐个样本追加
+        return np.array(self._output_data(step, region, output)[start:stop], dtype=np.float64).reshape(-1, 2)
+
+    def close(self):
+        self._data.clear()
+        self.odb.close()
+
+
+class ArrayHistory:
+    def __init__(self, path):
+        self.path = path
+        if path.lower().endswith(".npz"):
+            self._npz = np.load(path)
+            keys = self._npz.files
+            self._arrays = {}
+        else:
+            self._npz = None
+            self._arrays = self._read_csv(path)
+            keys = self._arrays
+        self._keys = {}
+        for key in keys:
+            step, region, output = key.split("|")
+            self._keys.setdefault(step, {}).setdefault(region, []).append(output)
+
+    @staticmethod
+    def _read_csv(path):
+        rows = {}
+        with open(path, "r", newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader)]
+            outputs = header[3:]
+            for row in reader:
+                if row:
+                    rows.setdefault((row[0], row[1]), []).append(row[2:])
+        arrays = {}
+        for (step, region), values in rows.items():
+            values = np.array(values, dtype=np.float64)
+            for j, output in enumerate(outputs):
+                arrays[f"{step}|{region}|{output}"] = values[:, [0, j + 1]]
+        return arrays
+
+    def _array(self, step, region, output):
+        # .npz 中的数组第一次读取时才载入，之后按块切片
+        key = f"{step}|{region}|{output}"
+        if key not in self._arrays:
+            self._arrays[key] = self._npz[key]
+        return self._arrays[key]
+
+    def steps(self):
+        return list(self._keys)
+
+    def regions(self, step):
+        return list(self._keys.get(step, {}))
+
+    def outputs(self, step, region):
+        return list(self._keys.get(step, {}).get(region, []))
+
+    def length(self, step, region, output):
+        return len(self._array(step, region, output))
+
+    def read(self, step, region, output, start=0, stop=None):
+        return np.asarray(self._array(step, region, output)[start:stop], dtype=np.float64).reshape(-1, 2)
+
+    def close(self):
+        if self._npz is not None:
+            self._npz.close()
+
+
+def open_history(path):
+    # .npz / .csv 使用导出的数据，其他按 ODB 打开
+    if os.path.splitext(path)[1].lower() in (".npz", ".csv"):
+        return ArrayHistory(path)
+    return OdbHistory(path)
+
+
+def export_history(history, path, steps=None, regions=None, outputs=("ALLAE", "ETOTAL")):
+    # 在 Abaqus 中把需要的历史输出导出为 .npz，之后可以在任何环境中检查
+    arrays = {}
+    for step in steps or history.steps():
+        for region in regions or history.regions(step):
+            for output in outputs:
+                if output in history.outputs(step, region):
+                    arrays[f"{step}|{region}|{output}"] = history.read(step, region, output)
+    np.savez(path, **arrays)
+    return len(arrays)
+
+
+def empty_result(path, threshold=0.05, numerator="ALLAE", denominator="ETOTAL", error=None):
+    # 与 check_energy 返回值结构相同；给出 error 时表示未能检查（例如文件打不开）
+    return {"path": path, "passed": error is None, "errors": [error] if error else [], "checked": 0, "exceedances": 0,
+            "examples": [], "first_exceedance": None, "max_ratio": 0.0, "max_ratio_at": None,
+            "series": {}, "threshold": threshold, "numerator": numerator, "denominator": denominator}
+
+
+def check_energy(history, steps=DEFAULT_STEPS, regions=DEFAULT_REGIONS, threshold=0.05, numerator="ALLAE",
+                 denominator="ETOTAL", chunk_size=CHUNK_SIZE, stop_on_exceed=False, keep_series=True,
+                 max_examples=MAX_EXAMPLES):
+    # 逐块读取 numerator / denominator 并检查 numerator > threshold * denominator
+    # steps / regions 为 None 时检查所有 step / 包含这两个输出的所有 region
+    # stop_on_exceed 时发现第一次超标后不再读取后续数据
+    # 返回:
+    #   passed, errors, checked（实际检查的 region 数，为 0 时记为错误）, exceedances（超标样本数）,
+    #   examples [(step, region, time, num, den, ratio)]
+    #   first_exceedance (step, region, time) 或 None, max_ratio, max_ratio_at (step, region, time)
+    #   series {(step, region): (time, num, den)}（keep_series 时，用于绘图）
+    result = empty_result(getattr(history, "path", None), threshold, numerator, denominator)
+    available = history.steps()
+    for step in steps or available:
+        if step not in available:
+            result["errors"].append(f"Step '{step}' not found in ODB file.")
+            continue
+        scan_all = not regions
+        for region in regions or history.regions(step):
+            if region not in history.regions(step):
+                result["errors"].append(f"History region '{region}' not found in step '{step}'.")
+                continue
+            names = history.outputs(step, region)
+            missing = [name for name in (numerator, denominator) if name not in names]
+            if missing:
+                if not scan_all:
+                    result["errors"].extend(f"{name} not found in history outputs of '{region}' in step '{step}'."
+                                            for name in missing)
+                continue
+            n = history.length(step, region, numerator)
+            if history.length(step, region, denominator) != n:
+                result["errors"].append(f"Mismatch in data lengths between time, {numerator}, and {denominator} "
+                                        f"in '{region}' of step '{step}'.")
+                continue
+
+            result["checked"] += 1
+            series = np.empty((n, 3)) if keep_series else None
+            count = 0
+            for start in range(0, n, max(chunk_size, 1)):
+                num = history.read(step, region, numerator, start, start + chunk_size)
+                den = history.read(step, region, denominator, start, start + chunk_size)
+                t, a, e = num[:, 0], num[:, 1], den[:, 1]
+                if series is not None:
+                    series[start:start + len(t)] = np.column_stack([t, a, e])
+                count = start + len(t)
+                ratio = np.divide(a, e, out=np.zeros_like(a), where=e != 0)
+                if len(ratio):
+                    k = int(np.argmax(ratio))
+                    if result["max_ratio_at"] is None or ratio[k] > result["max_ratio"]:
+                        result["max_ratio"], result["max_ratio_at"] = float(ratio[k]), (step, region, float(t[k]))
+                exceed = np.flatnonzero(a > threshold * e)
+                if not len(exceed):
+                    continue
+                if result["first_exceedance"] is None:
+                    result["first_exceedance"] = (step, region, float(t[exceed[0]]))
+                result["exceedances"] += len(exceed)
+                for i in exceed[:max_examples - len(result["examples"])]:
+                    result["examples"].append((step, region, float(t[i]), float(a[i]), float(e[i]), float(ratio[i])))
+                if stop_on_exceed:
+                    break
+            if series is not None:
+                result["series"][(step, region)] = series[:count]
+            if stop_on_exceed and result["exceedances"]:
+                break
+        if stop_on_exceed and result["exceedances"]:
+            break
+    if not result["checked"]:
+        # 例如 --all-regions 时没有任何 region 同时包含两个输出，或 ODB 中没有 step
+        where = "" if available else " (no steps in file)"
+        result["errors"].append(f"No history region with {numerator} and {denominator} found{where}.")
+    result["passed"] = not result["errors"] and not result["exceedances"]
+    return result
+
+
+def format_energy_report(result):
+    name = result["numerator"]
+    total = result["denominator"]
+    percent = f"{result['threshold'] * 100:g}%"
+    messages = [f"Error: {error}" for error in result["errors"]]
+    if result["exceedances"]:
+        messages.append(f"ERROR: Hourglass energy ({name}) exceeds {percent} of total energy ({total}) "
+                        f"at the following times:")
+        several = len({(step, region) for step, region, *_ in result["examples"]}) > 1
+        for step, region, t, a, e, ratio in result["examples"]:
+            where = f"{step}, {region}, " if several else ""
+            messages.append(f"{where}Time: {t:.4f}, {name}: {a:.4f}, {total}: {e:.4f}, Ratio: {ratio * 100:.2f}%")
+        if result["exceedances"] > len(result["examples"]):
+            messages.append(f"... and {result['exceedances'] - len(result['examples'])} more")
+        messages.append("Analysis aborted: 计算结果中存在 hourglass 超标.")
+    elif not result["errors"]:
+        messages.append(f"Check passed: Hourglass energy is within {percent} of total energy.")
+    if result["max_ratio_at"] is not None:
+        step, region, t = result["max_ratio_at"]
+        messages.append(f"Max {name}/{total} ratio: {result['max_ratio'] * 100:.2f}% at time {t:.4f} "
+                        f"({step}, {region})")
+    return messages
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+from system_model import cache_enabled, file_digest, model_digest
+
+# 增量生成：记录每个输出文件的输入 hash（模型节点、init 内容、方向）和内容 hash。
+# 重新运行时内容未变且磁盘上的文件未被改动的直接跳过，其余的原子写入（临时文件 + rename），
+# 本次没有生成、但上次生成过的文件视为过期文件。
+
+
+def text_digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode())
+    return h.hexdigest()
+
+
+def atomic_write(file_name, *parts):
+    tmp = f"{file_name}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        for part in parts:
+            f.write(part)
+    os.replace(tmp, file_name)
+
+
+class DeckManifest:
+    def __init__(self, path, inputs=None):
+        self.path = path
+        self.inputs = inputs or {}
+        try:
+            with open(path, "r") as f:
+                self.previous = json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            self.previous = {}
+        self.files = {}
+        self.written = []
+        self.skipped = []
+        self._prefix = {}
+
+    @classmethod
+    def for_inputs(cls, path, model_path, init_content, **inputs):
+        use_cache = cache_enabled()
+        inputs["model"] = model_digest(model_path) if use_cache else file_digest(model_path)
+        inputs["init"] = text_digest("".join(init_content))
+        return cls(path, inputs)
+
+    def digest(self, head, tail=""):
+        # 所有方向文件的开头（完整的 init 内容）相同，只计算一次 hash
+        if head not in self._prefix:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(head.encode())
+            self._prefix[head] = h
+        h = self._prefix[head].copy()
+        h.update(tail.encode())
+        return h.hexdigest()
+
+    def unchanged(self, file_name, digest):
+        entry = self.previous.get(os.path.basename(file_name))
+        if not entry or entry["digest"] != digest:
+            return False
+        try:
+            st = os.stat(file_name)
+        except OSError:
+            return False
+        return st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]
+
+    def record(self, file_name, digest, written, **inputs):
+        name = os.path.basename(file_name)
+        st = os.stat(file_name)
+        self.files[name] = {"digest": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                            "inputs": dict(self.inputs, **inputs)}
+        (self.written if written else self.skipped).append(file_name)
+
+    def write(self, file_name, head, tail="", **inputs):
+        # 内容变化时才写入，返回是否写入
+        digest = self.digest(head, tail)
+        if self.unchanged(file_name, digest):
+            self.record(file_name, digest, False, **inputs)
+            return False
+        atomic_write(file_name, head, tail)
+        self.record(file_name, digest, True, **inputs)
+        return True
+
+    def stale(self):
+        # 上次生成、本次不再生成的文件（例如删除了的方向）
+        directory = os.path.dirname(self.path)
+        return [os.path.join(directory, name) for name in self.previous if name not in self.files]
+
+    def remove_stale(self):
+        removed = []
+        for file_name in self.stale():
+            if os.path.exists(file_name):
+                os.remove(file_name)
+                removed.append(file_name)
+        return removed
+
+    def save(self, keep_stale=True):
+        files = dict(self.files)
+        if keep_stale:
+            # 保留过期文件的记录，以便之后仍能报告或清理
+            directory = os.path.dirname(self.path)
+            files.update((name, entry) for name, entry in self.previous.items()
+                         if name not in files and os.path.exists(os.path.join(directory, name)))
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"inputs": self.inputs, "files": files}, f, indent=1)
+        os.replace(tmp, self.path)
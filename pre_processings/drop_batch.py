@@ -0,0 +1,226 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from drop_generation import OUTPUT_MODES, deck_base_name, generate_decks
+from orientation_sweep import METRICS, run_sweep
+from run_report import RunReport
+from support_index import load_support_index
+from system_model import cache_enabled, clear_cache, load_nodes
+
+# 无界面批量生成跌落方向文件
+# 单个模型:
+#   python drop_batch.py --model model.txt --init init.txt --orientations ori.txt
+# 多个产品（manifest 为 JSON，路径相对于 manifest 所在目录）:
+#   python drop_batch.py --manifest products.json
+#   [{"name": "phone_a", "model": "a/model.txt", "init": "a/init.txt", "orientations": "a/ori.txt",
+#     "drop_height": 1500, "output_dir": "a/decks"}, ...]
+# 密集扫描（不需要 orientations 文件）:
+#   python drop_batch.py --model model.txt --init init.txt --sweep sphere:5000 --metric lever_arm --top 20
+# 多进程: --jobs 64。每个模型先由一个进程解析并写入缓存（含支撑点索引），
+# 使用同一模型的任务随后直接 memory-map 缓存，多个进程共享同一份页缓存
+
+
+def load_manifest(manifest_path):
+    with open(manifest_path, "r") as f:
+        jobs = json.load(f)
+    if isinstance(jobs, dict):
+        jobs = jobs["jobs"]
+    root = os.path.dirname(os.path.abspath(manifest_path))
+    for i, job in enumerate(jobs):
+        for key in ("model", "init", "orientations", "output_dir", "report_dir"):
+            if job.get(key) and isinstance(job[key], str):
+                job[key] = os.path.join(root, job[key])
+        job.setdefault("name", f"job_{i}")
+    return jobs
+
+
+def output_collisions(jobs):
+    # 输出基名（<init>_ori_*.txt、<init>_decks.manifest.json 等）或运行记录文件相同的任务会在不同进程中
+    # 同时写同一组文件，返回冲突说明的列表
+    messages = []
+    groups = {}
+    for job in jobs:
+        base = os.path.abspath(deck_base_name(job["init"], job.get("output_dir")))
+        groups.setdefault(("decks", base), []).append(job["name"])
+        if job.get("report_dir"):
+            report = os.path.abspath(os.path.join(job["report_dir"], f"{job['name']}_run_report.json"))
+            groups.setdefault(("report", report), []).append(job["name"])
+    for (kind, path), names in groups.items():
+        if len(names) > 1:
+            if kind == "decks":
+                messages.append(f"jobs {', '.join(names)} write decks to the same base {path} "
+                                f"(give each job its own output_dir)")
+            else:
+                messages.append(f"jobs {', '.join(names)} write the same run report {path} (give each job its own name)")
+    return messages
+
+
+def log_line(message):
+    # 整行一次写出，多个进程的输出不会在行内交错
+    sys.stdout.write(message + "\n")
+    sys.stdout.flush()
+
+
+def run_job(job, log=log_line):
+    # 每个任务记录各阶段的耗时和内存，放在返回的 "report" 中（给出 report_dir 时另存为 <name>_run_report.json）
+    start = time.perf_counter()
+    report = RunReport(job["name"], log=lambda message: log(f"[{job['name']}] {message}"))
+    job_log = report.log
+    try:
+        if job.get("sweep"):
+            mode, _, density = job["sweep"].partition(":")
+            result = run_sweep(job["model"], job["init"], mode, int(density or 1000),
+                               metric=job.get("metric", "lever_arm"), top=int(job.get("top", 10)),
+                               drop_height=job.get("drop_height"), output_dir=job.get("output_dir"),
+                               output_mode=job.get("output_mode", "full"), incremental=job.get("incremental", False),
+                               clean_stale=job.get("clean_stale", False), log=job_log, report=report)
+        else:
+            result = generate_decks(job["model"], job["init"], job["orientations"],
+                                    drop_height=job.get("drop_height"), output_dir=job.get("output_dir"),
+                                    output_mode=job.get("output_mode", "full"),
+                                    incremental=job.get("incremental", False),
+                                    clean_stale=job.get("clean_stale", False), log=job_log, report=report)
+        summary = {"name": job["name"], "ok": True, "files": len(result["files"])}
+    except Exception as e:
+        summary = {"name": job["name"], "ok": False, "error": str(e)}
+    summary["seconds"] = time.perf_counter() - start
+    summary["report"] = report.to_dict()
+    if job.get("report_dir"):
+        os.makedirs(job["report_dir"], exist_ok=True)
+        report.save(os.path.join(job["report_dir"], f"{job['name']}_run_report.json"))
+    report.log.flush()
+    return summary
+
+
+def prepare_model(model_path, needs_index):
+    # 解析模型并写入缓存，之后的任务都从缓存 memory-map
+    # 支撑点索引只在该模型有扫描任务时建立，普通任务逐个节点扫描更快
+    start = time.perf_counter()
+    system_model, _ = load_nodes(model_path)
+    coords = system_model[:, 1:4]
+    if needs_index and len(coords):
+        load_support_index(model_path, coords)
+    return time.perf_counter() - start
+
+
+def run_jobs(jobs, workers=1, log=log_line):
+    # 返回与 jobs 顺序一致的结果列表
+    if workers <= 1:
+        return [run_job(job, log) for job in jobs]
+
+    # 每个进程只用一个 BLAS 线程，避免 workers x 线程数 的超额订阅
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    use_cache = cache_enabled()
+    by_model = {}
+    for i, job in enumerate(jobs):
+        by_model.setdefault(os.path.abspath(job["model"]), []).append(i)
+
+    summary = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = {}
+        if use_cache:
+            for model, indices in by_model.items():
+                needs_index = any(jobs[i].get("sweep") for i in indices)
+                pending[pool.submit(prepare_model, model, needs_index)] = ("model", model)
+        else:
+            for i, job in enumerate(jobs):
+                pending[pool.submit(run_job, job)] = ("job", i)
+        while pending:
+            future = next(as_completed(pending))
+            kind, key = pending.pop(future)
+            if kind == "job":
+                summary[key] = future.result()
+                continue
+            try:
+                parse_seconds = future.result()
+                log(f"Parsed {key} in {parse_seconds:.2f} s")
+            except Exception as e:
+                for i in by_model[key]:
+                    summary[i] = {"name": jobs[i]["name"], "ok": False, "seconds": 0.0,
+                                  "error": f"failed to parse model: {e}"}
+                continue
+            for i in by_model[key]:
+                pending[pool.submit(run_job, jobs[i])] = ("job", i)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate drop orientation decks without the GUI.")
+    parser.add_argument("--model", help="system model file")
+    parser.add_argument("--init", help="system initial conditions file")
+    parser.add_argument("--orientations", help="drop orientations file")
+    parser.add_argument("--drop-height", type=float, help="drop height in mm (default: read from the init file)")
+    parser.add_argument("--output-dir", help="write decks here instead of next to the init file")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES,
+                        help="full: copy the init file into every deck (default); include: write it once and "
+                             "*include it; archive: like include, bundled into one zip")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rewrite decks whose content changed, tracked in <base>_decks.manifest.json")
+    parser.add_argument("--clean-stale", action="store_true",
+                        help="with --incremental, delete decks of orientations that are no longer generated")
+    parser.add_argument("--sweep", metavar="MODE:DENSITY",
+                        help="dense sweep instead of an orientations file, e.g. sphere:5000 or cube:5")
+    parser.add_argument("--metric", choices=sorted(METRICS), default="lever_arm", help="sweep ranking metric")
+    parser.add_argument("--top", type=int, default=10, help="number of worst sweep orientations to write decks for")
+    parser.add_argument("--manifest", help="JSON list of jobs with model/init/orientations keys")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--summary", help="write per-job timing, stage reports and failures to this JSON file")
+    parser.add_argument("--report-dir", help="also write one <job>_run_report.json per job here")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the parsed model cache")
+    parser.add_argument("--clear-cache", action="store_true", help="remove the parsed model cache first")
+    args = parser.parse_args(argv)
+
+    if args.clear_cache:
+        clear_cache()
+    if args.no_cache:
+        os.environ["AI_CAE_NO_CACHE"] = "1"
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+    elif args.model and args.init and (args.orientations or args.sweep):
+        jobs = [{"name": os.path.splitext(os.path.basename(args.model))[0], "model": args.model,
+                 "init": args.init, "orientations": args.orientations, "output_dir": args.output_dir}]
+    else:
+        parser.error("either --manifest or --model, --init and one of --orientations/--sweep are required")
+    for job in jobs:
+        if args.sweep and not job.get("orientations"):
+            job.setdefault("sweep", args.sweep)
+            job.setdefault("metric", args.metric)
+            job.setdefault("top", args.top)
+        if args.drop_height is not None:
+            job["drop_height"] = args.drop_height
+        if args.incremental:
+            job["incremental"] = True
+            job["clean_stale"] = args.clean_stale
+        if args.output_mode and not job.get("output_mode"):
+            job["output_mode"] = args.output_mode
+        if args.output_dir and not job.get("output_dir"):
+            job["output_dir"] = args.output_dir
+        if args.report_dir:
+            job["report_dir"] = args.report_dir
+    collisions = output_collisions(jobs)
+    if collisions:
+        parser.error("\n  ".join(["conflicting outputs:"] + collisions))
+
+    start = time.perf_counter()
+    summary = run_jobs(jobs, args.jobs)
+    elapsed = time.perf_counter() - start
+    failed = [s for s in summary if not s["ok"]]
+    for s in summary:
+        status = f"{s['files']} decks" if s["ok"] else f"FAILED: {s['error']}"
+        print(f"{s['name']}: {status} ({s['seconds']:.2f} s)")
+    print(f"{len(summary) - len(failed)}/{len(summary)} jobs succeeded in {elapsed:.2f} s using {args.jobs} worker(s)")
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump({"workers": args.jobs, "seconds": elapsed, "jobs": summary}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import os
+import zipfile
+
+import numpy as np
+
+from deck_manifest import DeckManifest
+from run_report import stage
+from support_index import load_support_index
+from system_model import load_nodes, format_skip_report
+
+# 跌落方向文件生成的核心逻辑，不依赖 GUI，可在无界面的计算节点上调用
+# Units: length in mm, time in ms, mass in g
+GRAVITY = 9.8e-3
+GROUND_NODE_BASE = 90000000
+MAX_ORIENTATIONS = 25
+# 节点数超过该值时才考虑支撑点索引，小模型直接扫描所有节点更快
+SUPPORT_INDEX_MIN_NODES = 100000
+# 逐个节点扫描约 7 ms / (1M 节点 x 方向)，建立索引约 1 s / 1M 节点（含 scipy 导入），
+# 方向数 x 节点数 达到该值（约 200 个方向，即扫描）时才值得建立索引；否则只使用已缓存的索引
+SUPPORT_INDEX_MIN_WORK = 2e8
+# 输出方式：
+#   full     每个方向文件都包含完整的 init 内容（原来的方式）
+#   include  init 内容只写一次到 <base>_shared.inc，每个方向文件用 *include 引用它，只写增量部分
+#   archive  同 include，但共享文件和所有增量文件打包到一个 <base>_ori_decks.zip 中
+OUTPUT_MODES = ("full", "include", "archive")
+
+
+def rotation_matrix(xn, yn, zn):
+    xn, yn, zn = np.radians(xn), np.radians(yn), np.radians(zn)
+    Rx = np.array([[1, 0, 0], [0, np.cos(xn), -np.sin(xn)], [0, np.sin(xn), np.cos(xn)]])
+    Ry = np.array([[np.cos(yn), 0, np.sin(yn)], [0, 1, 0], [-np.sin(yn), 0, np.cos(yn)]])
+    Rz = np.array([[np.cos(zn), -np.sin(zn), 0], [np.sin(zn), np.cos(zn), 0], [0, 0, 1]])
+    return Rz @ Ry @ Rx
+
+
+def model_dimensions(coords):
+    L = np.max(coords[:, 0]) - np.min(coords[:, 0])
+    W = np.max(coords[:, 1]) - np.min(coords[:, 1])
+    H = np.max(coords[:, 2]) - np.min(coords[:, 2])
+    o = np.mean(coords, axis=0)
+    return L, W, H, o
+
+
+def read_init_conditions(file_path):
+    with open(file_path, "r") as f:
+        return f.readlines()
+
+
+def find_drop_heights(init_content, log=None):
+    # 依次返回 init 文件中所有有效的 drop_height
+    for line in init_content:
+        if "drop_height" in line.lower():
+            try:
+                yield float(line.split("=")[1].strip())
+            except (IndexError, ValueError):
+                if log:
+                    log(f"Invalid drop_height format in line: {line.strip()}")
+
+
+def initial_velocity(drop_height, gravity=GRAVITY):
+    return np.sqrt(2 * drop_height * gravity)
+
+
+def parse_orientations(lines, numeric_only=True):
+    # numeric_only: 只读取以数字开头的行（文件输入）；否则每行都必须是数字（手动输入）
+    drop_orientations = []
+    for line in lines:
+        stripped_line = line.strip()
+        if numeric_only and not (stripped_line and stripped_line[0].isdigit()):
+            continue
+        values = list(map(float, stripped_line.split()))
+        if len(values) == 4:
+            drop_orientations.append(values)
+    return np.array(drop_orientations)
+
+
+def read_orientations(file_path):
+    with open(file_path, "r") as f:
+        return parse_orientations(f.readlines())
+
+
+def validate_orientations(drop_orientations):
+    if drop_orientations.ndim != 2 or drop_orientations.shape[0] == 0 \
+            or drop_orientations.shape[0] > MAX_ORIENTATIONS or drop_orientations.shape[1] != 4 \
+            or not np.all((drop_orientations[:, 0] >= 0) & (drop_orientations[:, 0] <= MAX_ORIENTATIONS) & (drop_orientations[:, 0] == drop_orientations[:, 0].astype(int))) \
+            or not np.all((drop_orientations[:, 1:4] >= -1) & (drop_orientations[:, 1:4] <= 1)):
+        raise ValueError("Invalid drop_orientations format")
+
+
+def rotation_matrices(angles):
+    # (K, 3) 角度 -> (K, 3, 3) 旋转矩阵，与 rotation_matrix 逐个计算的结果一致
+    a = np.radians(np.asarray(angles, dtype=float).reshape(-1, 3))
+    c, s = np.cos(a), np.sin(a)
+    R = np.zeros((3, len(a), 3, 3))
+    R[:, :, 0, 0] = R[:, :, 1, 1] = R[:, :, 2, 2] = 1
+    Rx, Ry, Rz = R
+    Rx[:, 1, 1], Rx[:, 1, 2], Rx[:, 2, 1], Rx[:, 2, 2] = c[:, 0], -s[:, 0], s[:, 0], c[:, 0]
+    Ry[:, 0, 0], Ry[:, 0, 2], Ry[:, 2, 0], Ry[:, 2, 2] = c[:, 1], s[:, 1], -s[:, 1], c[:, 1]
+    Rz[:, 0, 0], Rz[:, 0, 1], Rz[:, 1, 0], Rz[:, 1, 1] = c[:, 2], -s[:, 2], s[:, 2], c[:, 2]
+    return Rz @ Ry @ Rx
+
+
+def ground_normals(angles):
+    # R @ [0, 0, 1]
+    return rotation_matrices(angles)[:, :, 2]
+
+
+def support_distances(relative_coords, normals, block_size=4 * 1024 * 1024):
+    # 每个法向上所有节点投影的最大正值（没有正值时为 0），分块计算避免 (N, K) 大矩阵
+    d = np.zeros(len(normals))
+    rows = max(1, block_size // max(len(normals), 1))
+    for start in range(0, len(relative_coords), rows):
+        block = relative_coords[start:start + rows] @ normals.T
+        np.maximum(d, block.max(axis=0), out=d)
+    return d
+
+
+def model_support_index(model_path, coords, orientations=None):
+    # orientations 为要计算的方向数；None 时按扫描处理（总是建立索引）
+    if len(coords) < SUPPORT_INDEX_MIN_NODES:
+        return None
+    build = orientations is None or orientations * len(coords) >= SUPPORT_INDEX_MIN_WORK
+    return load_support_index(model_path, coords, build=build)
+
+
+def place_orientations(coords, p, drop_orientations, velocity, support_index=None):
+    # 每个方向：沿地面法向移动到模型最外侧，返回 p_new 和速度
+    # 模型和 p 每次平移相同的位移，coords - p 不变，因此所有方向可以一次算出，
+    # p 的累积平移用前缀和代替逐个修改整个模型
+    angles = np.asarray(drop_orientations, dtype=float)[:, 1:4]
+    normals = ground_normals(angles)
+    if support_index is not None:
+        d, _ = support_index.support(coords, p, normals)
+    else:
+        d = support_distances(coords - p, normals)
+    displacements = (d + 0.0001)[:, None] * normals
+    p_new = np.cumsum(np.vstack([p, displacements]), axis=0)[1:]
+    speeds = velocity * angles
+    return [{"angle": tuple(angle), "p_new": pn, "speed": speed}
+            for angle, pn, speed in zip(angles, p_new, speeds)]
+
+
+def deck_base_name(init_file, output_dir=None):
+    base_name = os.path.splitext(init_file)[0]
+    if output_dir:
+        base_name = os.path.join(output_dir, os.path.basename(base_name))
+    return base_name
+
+
+def deck_file_name(init_file, ori_id, angle, output_dir=None):
+    xn, yn, zn = angle
+    return f"{deck_base_name(init_file, output_dir)}_ori_{ori_id}_{xn:.2f}_{yn:.2f}_{zn:.2f}.txt"
+
+
+def orientation_keywords(ori_id, result, ground_width):
+    # 每个方向文件追加在 init 内容之后的部分
+    xn, yn, zn = result["angle"]
+    p_new = result["p_new"]
+    speed = result["speed"]
+    return (f"\n*parameters\nVx={speed[0]:.2f};\nVy={speed[1]:.2f};\nVz={speed[2]:.2f}"
+            f"\n*node\n{GROUND_NODE_BASE + ori_id}, {p_new[0]:.6f}, {p_new[1]:.6f}, {p_new[2]:.6f}"
+            f"\n*orientations, name=local_coord_ori_{ori_id}\n{p_new[0]:.6f}, {p_new[1]:.6f}, {p_new[2]:.6f}, {-xn:.6f}, {-yn:.6f}, {-zn:.6f}"
+            f"\n*SURFACE, TYPE=analytical_surface_type, NAME=ground_{ori_id}, FILLET RADIUS={ground_width:.2f}"
+            f"\n*RIGID BODY, NAME=ground_{ori_id}, REFERENCE NODE={GROUND_NODE_BASE + ori_id}, SURFACE=ground_{ori_id}")
+
+
+def shared_include_name(init_file, output_dir=None):
+    return f"{deck_base_name(init_file, output_dir)}_shared.inc"
+
+
+def manifest_name(init_file, output_dir=None):
+    return f"{deck_base_name(init_file, output_dir)}_decks.manifest.json"
+
+
+def write_decks(init_file, init_content, drop_orientations, results, ground_width, output_dir=None, mode="full",
+                manifest=None):
+    # manifest (DeckManifest) 不为空时只写入内容变化了的文件
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode '{mode}' (expected one of {', '.join(OUTPUT_MODES)})")
+    init_text = "".join(init_content)
+    shared_name = shared_include_name(init_file, output_dir)
+    head = init_text if mode == "full" else f"*include, input={os.path.basename(shared_name)}"
+    decks = []
+    for row, result in zip(drop_orientations, results):
+        ori_id = int(row[0])
+        decks.append((deck_file_name(init_file, ori_id, result["angle"], output_dir),
+                      orientation_keywords(ori_id, result, ground_width), [float(x) for x in row]))
+
+    if mode == "archive":
+        archive_name = f"{deck_base_name(init_file, output_dir)}_ori_decks.zip"
+        names = [os.path.basename(file_name) for file_name, _, _ in decks]
+        digest = manifest.digest(init_text, "".join(head + tail for _, tail, _ in decks)) if manifest else None
+        if manifest is None or not manifest.unchanged(archive_name, digest):
+            tmp = f"{archive_name}.{os.getpid()}.tmp"
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as archive:
+                archive.writestr(os.path.basename(shared_name), init_text)
+                for name, (_, tail, _) in zip(names, decks):
+                    archive.writestr(name, head + tail)
+            os.replace(tmp, archive_name)
+            written = True
+        else:
+            written = False
+        if manifest is not None:
+            manifest.record(archive_name, digest, written, orientations=[row for _, _, row in decks])
+        return [f"{archive_name}:{name}" for name in names]
+
+    if mode == "include":
+        if manifest is not None:
+            manifest.write(shared_name, init_text)
+        else:
+            with open(shared_name, "w") as f:
+                f.write(init_text)
+    for file_name, tail, row in decks:
+        if manifest is not None:
+            manifest.write(file_name, head, tail, orientation=row)
+        else:
+            with open(file_name, "w") as f:
+                f.write(head)
+                f.write(tail)
+    return [file_name for file_name, _, _ in decks]
+
+
+def load_model(model_path, log=print, report=None):
+    with stage(report, "parse", bytes=os.path.getsize(model_path)) as s:
+        system_model, skipped = load_nodes(model_path)
+        s.add(nodes=len(system_model), skipped_lines=sum(skipped["skipped"].values()))
+    for message in format_skip_report(skipped):
+        log(message)
+    if system_model.size == 0:
+        raise ValueError(f"No valid data found in system model file {model_path}")
+    coords = system_model[:, 1:4]
+    with stage(report, "dimensions", nodes=len(coords)):
+        L, W, H, o = model_dimensions(coords)
+    log(f"{model_path}: {len(system_model)} nodes, L={L:.2f} mm, W={W:.2f} mm, H={H:.2f} mm")
+    return system_model, o, max(L, W, H)
+
+
+def load_drop_velocity(init_path, drop_height=None, log=print, report=None):
+    # drop_height 取参数或 init 文件中第一个有效值
+    with stage(report, "init", bytes=os.path.getsize(init_path)) as s:
+        init_content = read_init_conditions(init_path)
+        s.add(lines=len(init_content))
+    if drop_height is None:
+        drop_height = next(find_drop_heights(init_content, log), None)
+    if drop_height is None:
+        raise ValueError(f"No valid drop_height found in {init_path}")
+    velocity = initial_velocity(drop_height)
+    log(f"drop_height = {drop_height} mm, initial_velocity = {velocity:.2f} mm/ms")
+    return init_content, drop_height, velocity
+
+
+def open_manifest(model_path, init_path, init_content, drop_height, output_dir=None, output_mode="full"):
+    return DeckManifest.for_inputs(manifest_name(init_path, output_dir), model_path, init_content,
+                                   drop_height=drop_height, mode=output_mode)
+
+
+def finish_manifest(manifest, clean_stale=False, log=print):
+    log(f"{len(manifest.written)} files written, {len(manifest.skipped)} unchanged")
+    if clean_stale:
+        for file_name in manifest.remove_stale():
+            log(f"Removed stale file {file_name}")
+    else:
+        for file_name in manifest.stale():
+            log(f"Stale file from a previous run: {file_name}")
+    manifest.save()
+
+
+def written_bytes(file_names):
+    # write_decks 返回的文件（archive 模式为 "archive:member"）在磁盘上的总大小
+    paths = {name.rsplit(":", 1)[0] if not os.path.exists(name) else name for name in file_names}
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def generate_decks(model_path, init_path, orientations, drop_height=None, output_dir=None, output_mode="full",
+                   incremental=False, clean_stale=False, log=print, report=None):
+    # incremental: 按 manifest 只重写变化了的文件，并报告（clean_stale 时删除）不再生成的旧文件
+    # report: run_report.RunReport，记录各阶段耗时和内存
+    # 无交互版本的 run_simulation
+    system_model, o, ground_width = load_model(model_path, log, report)
+    coords = system_model[:, 1:4]
+    init_content, drop_height, velocity = load_drop_velocity(init_path, drop_height, log, report)
+
+    with stage(report, "orientations") as s:
+        if isinstance(orientations, str):
+            orientations = read_orientations(orientations)
+        drop_orientations = np.asarray(orientations, dtype=float)
+        validate_orientations(drop_orientations)
+        s.add(orientations=len(drop_orientations))
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with stage(report, "support_index", nodes=len(coords)):
+        index = model_support_index(model_path, coords, len(drop_orientations))
+    with stage(report, "placement", orientations=len(drop_orientations), nodes=len(coords)):
+        results = place_orientations(coords, o.copy(), drop_orientations, velocity, index)
+    with stage(report, "write") as s:
+        manifest = open_manifest(model_path, init_path, init_content, drop_height, output_dir, output_mode) \
+            if incremental else None
+        file_names = write_decks(init_path, init_content, drop_orientations, results, ground_width, output_dir,
+                                 output_mode, manifest)
+        if manifest is not None:
+            finish_manifest(manifest, clean_stale, log)
+        s.add(files=len(file_names), bytes=written_bytes(file_names))
+    log(f"Generated {len(file_names)} drop orientation files based on {init_path}")
+    return {"files": file_names, "results": results, "ground_width": ground_width,
+            "drop_height": drop_height, "system_model": system_model}
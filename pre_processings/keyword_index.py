@@ -0,0 +1,185 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+from collections import namedtuple
+
+from system_model import CACHE_DIR, CHUNK_SIZE, cache_enabled, model_digest
+
+# 关键字索引：一次遍历记录文件中每个关键字（** 注释除外）的名字、参数、行号和字节范围，
+# 并递归索引 *include 引用的文件。之后各个工具按索引直接 memory-map 到需要的块，不再逐行扫描整个文件。
+#   keyword  去掉首尾空白的关键字行原文，如 "*tie, name=pair1, adjust=no"
+#   name     小写的关键字名，如 "tie"；params 为小写参数名 -> 参数值（无值的参数为 ""）
+#   line     关键字所在行号（从 1 开始），数据从 line + 1 行开始
+#   start/end 关键字行的字节范围，数据块为 [end, data_end)，到下一个关键字为止（可能含注释行）
+#   file     所在文件在 KeywordIndex.files 中的下标，0 为主文件
+Keyword = namedtuple("Keyword", "name params keyword line start end data_end file")
+
+INDEX_VERSION = 1
+_SPACES = re.compile(r"\s+")
+
+
+def parse_keyword(keyword):
+    # "*Tie, name=pair1, adjust" -> ("tie", {"name": "pair1", "adjust": ""})
+    parts = keyword.lstrip("*").split(",")
+    name = _SPACES.sub(" ", parts[0].strip()).lower()
+    params = {}
+    for part in parts[1:]:
+        key, _, value = part.partition("=")
+        if key.strip():
+            params[key.strip().lower()] = value.strip()
+    return name, params
+
+
+def _scan(f, file_id, chunk_size):
+    # 返回 (keywords, 文件中是否有单独的 \r 换行)
+    keywords = []
+    offset = 0
+    line_no = 0
+    lone_cr = False
+    tail = b""
+    while True:
+        data = f.read(chunk_size)
+        chunk = tail + data
+        if data:
+            cut = chunk.rfind(b"\n") + 1
+            if cut == 0:
+                tail = chunk
+                continue
+            chunk, tail = chunk[:cut], chunk[cut:]
+        elif not chunk:
+            break
+        else:
+            tail = b""
+        lone_cr = lone_cr or chunk.count(b"\r") != chunk.count(b"\r\n")
+        pos = 0
+        star = chunk.find(b"*")
+        while star >= 0:
+            start = chunk.rfind(b"\n", 0, star) + 1
+            end = chunk.find(b"\n", star) + 1 or len(chunk)
+            if not chunk[start:star].strip() and not chunk.startswith(b"**", star):
+                line_no += chunk.count(b"\n", pos, start)
+                pos = start
+                if keywords:
+                    keywords[-1] = keywords[-1]._replace(data_end=offset + start)
+                text = chunk[start:end].strip().decode("utf-8", "replace")
+                name, params = parse_keyword(text)
+                keywords.append(Keyword(name, params, text, line_no + 1, offset + start, offset + end, None, file_id))
+            star = chunk.find(b"*", end)
+        line_no += chunk.count(b"\n", pos)
+        offset += len(chunk)
+        if not data:
+            break
+    if keywords:
+        keywords[-1] = keywords[-1]._replace(data_end=offset)
+    return keywords, lone_cr
+
+
+class KeywordIndex:
+    def __init__(self, files, keywords, missing=()):
+        self.files = files            # [{"path", "size", "mtime_ns", "lone_cr"}]，0 为主文件
+        self.keywords = keywords
+        self.missing = list(missing)  # 找不到的 *include 文件
+
+    @classmethod
+    def build(cls, file_path, follow_includes=True, chunk_size=CHUNK_SIZE):
+        files, keywords, missing = [], [], []
+        seen = {}
+        queue = [os.path.abspath(file_path)]
+        while queue:
+            path = queue.pop(0)
+            if path in seen:
+                continue
+            seen[path] = len(files)
+            st = os.stat(path)
+            with open(path, "rb") as f:
+                found, lone_cr = _scan(f, len(files), chunk_size)
+            files.append({"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "lone_cr": lone_cr})
+            keywords.extend(found)
+            if not follow_includes:
+                break
+            for k in found:
+                if k.name == "include" and k.params.get("input"):
+                    target = os.path.join(os.path.dirname(path), k.params["input"].strip("\"'"))
+                    if os.path.exists(target):
+                        queue.append(os.path.abspath(target))
+                    else:
+                        missing.append(target)
+        return cls(files, keywords, missing)
+
+    def up_to_date(self):
+        for entry in self.files:
+            try:
+                st = os.stat(entry["path"])
+            except OSError:
+                return False
+            if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+                return False
+        return True
+
+    def find(self, name=None, match=None, file_id=0):
+        # 按名字（小写）或对关键字原文的判断函数查找；file_id=None 时包括所有 *include 文件
+        return [k for k in self.keywords
+                if (file_id is None or k.file == file_id)
+                and (name is None or k.name == name)
+                and (match is None or match(k.keyword))]
+
+    def open(self, file_id=0):
+        # 只读 memory-map；空文件返回 b""
+        path = self.files[file_id]["path"]
+        if not self.files[file_id]["size"]:
+            return b""
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def save(self, path):
+        rows = [[k.name, k.params, k.keyword, k.line, k.start, k.end, k.data_end, k.file] for k in self.keywords]
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files, "missing": self.missing,
+                       "keywords": rows}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"keyword index version {data.get('version')} is not {INDEX_VERSION}")
+        return cls(data["files"], [Keyword(*row) for row in data["keywords"]], data["missing"])
+
+
+def iter_block_lines(data, keyword):
+    # 逐行返回数据块中的 (行号, 起始字节, 结束字节, 原始行)，data 为 KeywordIndex.open 的结果
+    line_no = keyword.line
+    pos = keyword.end
+    while pos < keyword.data_end:
+        end = data.find(b"\n", pos, keyword.data_end) + 1 or keyword.data_end
+        line_no += 1
+        yield line_no, pos, end, data[pos:end]
+        pos = end
+
+
+def load_keyword_index(file_path, cache_dir=None, use_cache=None):
+    # 与解析后的节点缓存放在同一目录，按模型内容 hash 命名；*include 文件按 size/mtime 检查是否变化
+    if use_cache is None:
+        use_cache = cache_enabled()
+    if not use_cache:
+        return KeywordIndex.build(file_path)
+    cache_dir = cache_dir or CACHE_DIR
+    digest = model_digest(file_path, cache_dir)
+    # *include 按文件所在目录解析，相同内容、不同位置的文件分别索引
+    where = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=4).hexdigest()
+    path = os.path.join(cache_dir, f"{digest}.keywords-{where}-v{INDEX_VERSION}.json")
+    if os.path.exists(path):
+        try:
+            index = KeywordIndex.load(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            index = None
+        if index is not None and index.up_to_date():
+            return index
+    index = KeywordIndex.build(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    index.save(path)
+    return index
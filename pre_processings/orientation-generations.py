@@ -1,10 +1,22 @@
-import numpy as np
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from tkinter import ttk
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+import numpy as np
+from system_model import load_nodes, format_skip_report
+from drop_generation import (GRAVITY, rotation_matrix, model_dimensions, read_init_conditions, find_drop_heights,
+                             initial_velocity, parse_orientations, read_orientations, validate_orientations,
+                             model_support_index, place_orientations, write_decks, written_bytes, deck_base_name,
+                             ground_normals)
+from run_report import RunReport
+from render import render_async, render_grounds, render_model
+
+# tkinter 只在打开界面时导入（无界面的批量生成见 drop_batch.py）
+tk = filedialog = messagebox = scrolledtext = ttk = None
+
+
+def load_gui():
+    global tk, filedialog, messagebox, scrolledtext, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, scrolledtext, ttk
+
 
 class DropSimulationGUI:
     def __init__(self, root):
@@ -81,41 +93,29 @@ class DropSimulationGUI:
         self.log.see(tk.END)
 
     def read_system_model(self, file_path):
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-
-        system_model = []
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith("*node"):
-                i += 1
-                while i < len(lines):
-                    next_line = lines[i].strip()
-                    if next_line.startswith("**"):
-                        i += 1
-                        continue
-                    if next_line.startswith("*") and not next_line.startswith("*node"):
-                        break
-                    if next_line and next_line[0].isdigit():
-                        cleaned_line = next_line.replace(",", " ")
-                        parts = cleaned_line.split()
-                        if len(parts) == 4:
-                            try:
-                                values = [float(parts[0])] + [float(x) for x in parts[1:]]
-                                if all(c.isdigit() or c in "., -" for c in next_line):
-                                    system_model.append(values)
-                                else:
-                                    self.log_message(f"Skipping invalid line (unexpected characters): {next_line}")
-                            except ValueError:
-                                self.log_message(f"Skipping invalid line (non-numeric): {next_line}")
-                        else:
-                            self.log_message(f"Skipping invalid line (wrong number of values): {next_line}")
-                    i += 1
-            else:
-                i += 1
-
-        return np.array(system_model)
+        # 解析结果缓存在 AI_CAE_CACHE_DIR 中，AI_CAE_NO_CACHE=1 时跳过缓存
+        system_model, report = load_nodes(file_path)
+        for message in format_skip_report(report):
+            self.log_message(message)
+        return system_model
+
+    def show_rendered(self, future, title, message):
+        # 后台渲染完成后在新窗口中显示图片，界面不等待 matplotlib
+        if not future.done():
+            self.root.after(200, self.show_rendered, future, title, message)
+            return
+        try:
+            file_name = future.result()
+        except Exception as e:
+            self.log_message(f"Error rendering {title.lower()}: {str(e)}")
+            return
+        self.log_message(f"{message} Saved as: {file_name}")
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        image = tk.PhotoImage(file=file_name)
+        label = tk.Label(window, image=image)
+        label.image = image
+        label.pack()
 
     def visualize_system_model(self):
         try:
@@ -129,204 +129,123 @@ class DropSimulationGUI:
                 messagebox.showerror("Error", "No valid data found in system model file!")
                 return
 
-            coords = system_model[:, 1:4]
-            fig = plt.figure(figsize=(8, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            ax.scatter(coords[:, 0], coords[:, 1], coords[:, 2], c='b', marker='o')
-            ax.set_xlabel('X (mm)')
-            ax.set_ylabel('Y (mm)')
-            ax.set_zlabel('Z (mm)')
-            ax.set_title('System Model 3D Visualization')
-            plt.show()
-
-            self.log_message("System model visualization displayed successfully.")
+            coords = np.asarray(system_model[:, 1:4])
+            file_name = f"{os.path.splitext(system_model_path)[0]}_model.png"
+            future = render_async(render_model, file_name, coords)
+            self.show_rendered(future, "System Model", "System model visualization displayed successfully.")
 
         except Exception as e:
             self.log_message(f"Error visualizing system model: {str(e)}")
             messagebox.showerror("Error", f"Failed to visualize system model: {str(e)}")
 
     def rotation_matrix(self, xn, yn, zn):
-        xn, yn, zn = np.radians(xn), np.radians(yn), np.radians(zn)
-        Rx = np.array([[1, 0, 0], [0, np.cos(xn), -np.sin(xn)], [0, np.sin(xn), np.cos(xn)]])
-        Ry = np.array([[np.cos(yn), 0, np.sin(yn)], [0, 1, 0], [-np.sin(yn), 0, np.cos(yn)]])
-        Rz = np.array([[np.cos(zn), -np.sin(zn), 0], [np.sin(zn), np.cos(zn), 0], [0, 0, 1]])
-        return Rz @ Ry @ Rx
-
-    def visualize_all_grounds(self, system_model, results, ground_width, drop_orientations):
-        coords = system_model[:, 1:4].copy()
-        num_orientations = len(results)
-        cols = int(np.ceil(np.sqrt(num_orientations)))
-        rows = int(np.ceil(num_orientations / cols))
-
-        fig = plt.figure(figsize=(5 * cols, 5 * rows))
-        current_coords = coords.copy()
-
-        for i, (result, orientation) in enumerate(zip(results, drop_orientations[:, 1:4])):
-            p_new = result["p_new"]
-            speed = result["speed"]
-            xn, yn, zn = -orientation  # Opposite of drop orientation
-            R = self.rotation_matrix(xn, yn, zn)
-            normal = R @ np.array([0, 0, 1])  # Ground normal
+        return rotation_matrix(xn, yn, zn)
 
+    def visualize_all_grounds(self, system_model, results, ground_width, drop_orientations, file_name):
+        normals = ground_normals(-np.asarray(drop_orientations[:, 1:4], dtype=float))  # Opposite of drop orientation
+        for i, normal in enumerate(normals):
             # Debugging: Log normal vector
             self.log_message(f"Orientation {i}: Normal = {normal}")
-
-            ax = fig.add_subplot(rows, cols, i + 1, projection='3d')
-            ax.scatter(current_coords[:, 0], current_coords[:, 1], current_coords[:, 2], c='b', marker='o', label='System Model')
-
-            # Generate circle on plane perpendicular to normal
-            radius = ground_width / 2
-            theta = np.linspace(0, 2 * np.pi, 100)
-            u = np.cross(normal, [1, 0, 0]) if not np.allclose(normal, [1, 0, 0]) else np.cross(normal, [0, 1, 0])
-            u = u / (np.linalg.norm(u) + 1e-10)  # Avoid division by zero
-            v = np.cross(normal, u)
-            v = v / (np.linalg.norm(v) + 1e-10)
-            x_circle = p_new[0] + radius * (np.cos(theta) * u[0] + np.sin(theta) * v[0])
-            y_circle = p_new[1] + radius * (np.cos(theta) * u[1] + np.sin(theta) * v[1])
-            z_circle = p_new[2] + radius * (np.cos(theta) * u[2] + np.sin(theta) * v[2])
-            ax.plot(x_circle, y_circle, z_circle, c='gray', label='Ground')
-
-            # Velocity arrow
-            ax.quiver(p_new[0], p_new[1], p_new[2], speed[0], speed[1], speed[2], color='r', label='Velocity')
-
-            ax.set_xlabel('X (mm)')
-            ax.set_ylabel('Y (mm)')
-            ax.set_zlabel('Z (mm)')
-            ax.set_title(f"Orientation {i}")
-            ax.legend()
-
-            # Update coordinates
-            if i < len(results) - 1:
-                next_displacement = results[i + 1]["p_new"] - p_new
-                current_coords += next_displacement
-
-        plt.tight_layout()
-        plt.show()
+        future = render_async(render_grounds, file_name, np.asarray(system_model[:, 1:4]), results, normals,
+                              ground_width)
+        self.show_rendered(future, "Drop Orientations", "Visualized all grounds and system model positions.")
 
     def run_simulation(self):
         self.log.delete(1.0, tk.END)
+        # 各阶段耗时和内存写入 <init>_run_report.json；跳过行的消息限流，避免大量消息拖慢界面，其余结果照常输出
+        report = RunReport("run_simulation", log=self.log_message)
+        log = report.result
+        init_file = None
         try:
             # 1. Load system model
             system_model_path = self.system_model_path.get()
             if not system_model_path:
                 raise ValueError("System model file not specified")
-            system_model = self.read_system_model(system_model_path)
+            with report.stage("parse", bytes=os.path.getsize(system_model_path)) as s:
+                system_model, skipped = load_nodes(system_model_path)
+                s.add(nodes=len(system_model), skipped_lines=sum(skipped["skipped"].values()))
+            for message in format_skip_report(skipped):
+                report.log(message)
             if system_model.size == 0:
                 raise ValueError("No valid data found in system model file")
-            self.log_message(f"System model read from file (coordinates in mm):\nFirst 5 rows:\n{system_model[:5]}\nTotal points: {len(system_model)}")
+            log(f"System model read from file (coordinates in mm):\nFirst 5 rows:\n{system_model[:5]}\nTotal points: {len(system_model)}")
 
             # 2. Calculate dimensions
             coords = system_model[:, 1:4]
-            L = np.max(coords[:, 0]) - np.min(coords[:, 0])
-            W = np.max(coords[:, 1]) - np.min(coords[:, 1])
-            H = np.max(coords[:, 2]) - np.min(coords[:, 2])
-            self.log_message(f"Object spatial dimensions: L={L:.2f} mm, W={W:.2f} mm, H={H:.2f} mm")
+            with report.stage("dimensions", nodes=len(coords)):
+                L, W, H, o = model_dimensions(coords)
+            log(f"Object spatial dimensions: L={L:.2f} mm, W={W:.2f} mm, H={H:.2f} mm")
 
             # 3. Calculate center point
-            o = np.mean(coords, axis=0)
-            self.log_message(f"Center point o: ({o[0]:.2f}, {o[1]:.2f}, {o[2]:.2f}) mm")
+            log(f"Center point o: ({o[0]:.2f}, {o[1]:.2f}, {o[2]:.2f}) mm")
 
             # 4. Define circular ground
             ground_width = max(L, W, H)
             p = o.copy()
-            self.log_message(f"Circular ground diameter: {ground_width:.2f} mm, Initial center p: ({p[0]:.2f}, {p[1]:.2f}, {p[2]:.2f}) mm")
+            log(f"Circular ground diameter: {ground_width:.2f} mm, Initial center p: ({p[0]:.2f}, {p[1]:.2f}, {p[2]:.2f}) mm")
 
             # 5. Load initial conditions and process drop_height
             init_file = self.init_conditions_path.get()
             if not init_file:
                 raise ValueError("System initial conditions file not specified")
-            with open(init_file, "r") as f:
-                init_content = f.readlines()
+            with report.stage("init", bytes=os.path.getsize(init_file)) as s:
+                init_content = read_init_conditions(init_file)
+                s.add(lines=len(init_content))
 
             drop_height = None
-            gravity = 9.8e-3
-            for line in init_content:
-                if "drop_height" in line.lower():
-                    try:
-                        drop_height = float(line.split("=")[1].strip())
-                        self.log_message(f"Found drop_height = {drop_height} mm in {init_file}")
-                        if messagebox.askyesno("Confirm", f"Is drop_height = {drop_height} mm correct?"):
-                            break
-                        else:
-                            drop_height = None
-                    except (IndexError, ValueError):
-                        self.log_message(f"Invalid drop_height format in line: {line.strip()}")
+            for candidate in find_drop_heights(init_content, log):
+                log(f"Found drop_height = {candidate} mm in {init_file}")
+                if messagebox.askyesno("Confirm", f"Is drop_height = {candidate} mm correct?"):
+                    drop_height = candidate
+                    break
             if drop_height is None:
                 drop_height = float(tk.simpledialog.askstring("Input", "No valid drop_height found. Please enter drop_height (in mm):"))
-            initial_velocity = np.sqrt(2 * drop_height * gravity)
-            self.log_message(f"Calculated initial_velocity = {initial_velocity:.2f} mm/ms based on drop_height = {drop_height} mm and gravity = {gravity} mm/ms^2")
+            velocity = initial_velocity(drop_height)
+            log(f"Calculated initial_velocity = {velocity:.2f} mm/ms based on drop_height = {drop_height} mm and gravity = {GRAVITY} mm/ms^2")
 
             # 6. Load drop orientations
-            if self.drop_input_method.get() == "file":
-                drop_file = self.drop_orientations_path.get()
-                if not drop_file:
-                    raise ValueError("Drop orientations file not specified")
-                with open(drop_file, "r") as f:
-                    lines = f.readlines()
-                drop_orientations = []
-                for line in lines:
-                    stripped_line = line.strip()
-                    if stripped_line and stripped_line[0].isdigit():
-                        values = list(map(float, stripped_line.split()))
-                        if len(values) == 4:
-                            drop_orientations.append(values)
-            else:
-                manual_input = self.drop_manual_text.get(1.0, tk.END).strip()
-                if not manual_input:
-                    raise ValueError("Manual drop orientations input is empty")
-                drop_orientations = []
-                for line in manual_input.split("\n"):
-                    values = list(map(float, line.split()))
-                    if len(values) == 4:
-                        drop_orientations.append(values)
-            drop_orientations = np.array(drop_orientations)
-            if drop_orientations.shape[0] > 25 or drop_orientations.shape[1] != 4 or not np.all((drop_orientations[:, 0] >= 0) & (drop_orientations[:, 0] <= 25) & (drop_orientations[:, 0] == drop_orientations[:, 0].astype(int))) or not np.all((drop_orientations[:, 1:4] >= -1) & (drop_orientations[:, 1:4] <= 1)):
-                raise ValueError("Invalid drop_orientations format")
-            self.log_message(f"Valid drop orientations array:\n{drop_orientations}")
+            with report.stage("orientations") as s:
+                if self.drop_input_method.get() == "file":
+                    drop_file = self.drop_orientations_path.get()
+                    if not drop_file:
+                        raise ValueError("Drop orientations file not specified")
+                    drop_orientations = read_orientations(drop_file)
+                else:
+                    manual_input = self.drop_manual_text.get(1.0, tk.END).strip()
+                    if not manual_input:
+                        raise ValueError("Manual drop orientations input is empty")
+                    drop_orientations = parse_orientations(manual_input.split("\n"), numeric_only=False)
+                validate_orientations(drop_orientations)
+                s.add(orientations=len(drop_orientations))
+            log(f"Valid drop orientations array:\n{drop_orientations}")
 
             # 7. Process each orientation
-            results = []
-            angles = drop_orientations[:, 1:4]
-            for i, angle in enumerate(angles):
-                xn, yn, zn = angle
-                R = self.rotation_matrix(xn, yn, zn)
-                vn = R @ np.array([0, 0, 1])
-
-                relative_coords = coords - p
-                distances = np.dot(relative_coords, vn)
-                positive_distances = distances[distances > 0]
-                d = np.max(positive_distances) if len(positive_distances) > 0 else 0
-                move_distance = d + 0.0001
-                displacement = move_distance * vn
-
-                p_new = p + displacement
-                speed = np.array([initial_velocity * xn, initial_velocity * yn, initial_velocity * zn])
-
-                base_name = os.path.splitext(init_file)[0]
-                file_name = f"{base_name}_ori_{int(drop_orientations[i, 0])}_{xn:.2f}_{yn:.2f}_{zn:.2f}.txt"
-                with open(file_name, "w") as f:
-                    f.write("".join(init_content))
-                    f.write(f"\n*parameters\nVx={speed[0]:.2f};\nVy={speed[1]:.2f};\nVz={speed[2]:.2f}")
-                    f.write(f"\n*node\n{90000000 + int(drop_orientations[i, 0])}, {p_new[0]:.6f}, {p_new[1]:.6f}, {p_new[2]:.6f}")
-                    f.write(f"\n*orientations, name=local_coord_ori_{int(drop_orientations[i, 0])}\n{p_new[0]:.6f}, {p_new[1]:.6f}, {p_new[2]:.6f}, {-xn:.6f}, {-yn:.6f}, {-zn:.6f}")
-                    f.write(f"\n*SURFACE, TYPE=analytical_surface_type, NAME=ground_{int(drop_orientations[i, 0])}, FILLET RADIUS={ground_width:.2f}")
-                    f.write(f"\n*RIGID BODY, NAME=ground_{int(drop_orientations[i, 0])}, REFERENCE NODE={90000000 + int(drop_orientations[i, 0])}, SURFACE=ground_{int(drop_orientations[i, 0])}")
-
-                results.append({"angle": (xn, yn, zn), "p_new": p_new, "speed": speed})
-                p = p_new
-                coords = coords + displacement
-
-            self.log_message(f"Generated {len(angles)} drop orientation files based on {init_file}")
+            with report.stage("support_index", nodes=len(coords)):
+                index = model_support_index(system_model_path, coords, len(drop_orientations))
+            with report.stage("placement", orientations=len(drop_orientations), nodes=len(coords)):
+                results = place_orientations(coords, p, drop_orientations, velocity, index)
+            with report.stage("write") as s:
+                file_names = write_decks(init_file, init_content, drop_orientations, results, ground_width)
+                s.add(files=len(file_names), bytes=written_bytes(file_names))
+            log(f"Generated {len(results)} drop orientation files based on {init_file}")
+            report.log_summary()
             messagebox.showinfo("Success", "Simulation completed successfully!")
 
-            self.visualize_all_grounds(system_model, results, ground_width, drop_orientations)
-            self.log_message("Visualized all grounds and system model positions.")
+            self.visualize_all_grounds(system_model, results, ground_width, drop_orientations,
+                                       f"{deck_base_name(init_file)}_grounds.png")
 
         except Exception as e:
-            self.log_message(f"Error: {str(e)}")
+            log(f"Error: {str(e)}")
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        finally:
+            base = deck_base_name(init_file) if init_file else os.path.splitext(self.system_model_path.get() or "drop")[0]
+            try:
+                self.log_message(f"Run report saved as: {report.save(f'{base}_run_report.json')}")
+            except OSError as e:
+                self.log_message(f"Could not save run report: {str(e)}")
 
 if __name__ == "__main__":
+    load_gui()
     root = tk.Tk()
     app = DropSimulationGUI(root)
     root.mainloop()
\ No newline at end of file
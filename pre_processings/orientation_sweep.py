@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+
+from drop_generation import (deck_base_name, finish_manifest, load_drop_velocity, load_model, open_manifest,
+                             write_decks, written_bytes)
+from run_report import stage
+from support_index import load_support_index
+
+# 大量候选跌落方向的快速扫描：批量计算每个方向的接触点和冲击方向，
+# 按指标排序，只为最危险的 top-N 方向生成完整的计算文件
+# 扫描的方向都是单位向量（速度大小等于 v0），生成文件时地面垂直于冲击方向、与排序用的接触点相接，
+# 而不是像方向文件那样把 (xn, yn, zn) 当作旋转角度计算地面法向
+
+
+def sample_orientations(mode, density):
+    # sphere: density 个均匀分布的单位向量（Fibonacci 球面采样）
+    # cube:   [-1, 1]^3 立方体表面上每条边 density 个点的网格，density=3 即 26 个面/棱/角方向，归一化为单位向量
+    if mode == "sphere":
+        k = np.arange(density) + 0.5
+        z = 1 - 2 * k / density
+        r = np.sqrt(np.maximum(1 - z ** 2, 0))
+        phi = np.pi * (3 - np.sqrt(5)) * k
+        angles = np.column_stack([r * np.cos(phi), r * np.sin(phi), z])
+    elif mode == "cube":
+        if density < 2:
+            raise ValueError("cube sampling needs at least 2 points per edge")
+        t = np.linspace(-1, 1, density)
+        grid = np.stack(np.meshgrid(t, t, t, indexing="ij"), axis=-1).reshape(-1, 3)
+        angles = grid[np.max(np.abs(grid), axis=1) == 1]
+        angles = angles / np.linalg.norm(angles, axis=1)[:, None]
+    else:
+        raise ValueError(f"Unknown sampling mode '{mode}' (expected 'sphere' or 'cube')")
+    return np.column_stack([np.arange(len(angles)), angles])
+
+
+def evaluate_orientations(coords, center, drop_orientations, support_index):
+    # 所有方向一次算出：
+    #   impact_direction 速度方向（单位向量），也是生成文件时的地面法向
+    #   contact          沿速度方向最先触地的节点（支撑点）
+    #   support_distance 重心到接触平面的距离，即生成文件时地面沿法向的偏移
+    #   lever_arm        重心到过接触点的冲击线的距离
+    angles = np.asarray(drop_orientations, dtype=float)[:, 1:4]
+    lengths = np.linalg.norm(angles, axis=1)
+    impact = angles / np.where(lengths > 0, lengths, 1)[:, None]
+    support_distance, contact = support_index.support(coords, center, impact)
+    arm = coords[contact] - center
+    along = np.sum(arm * impact, axis=1)
+    lever_arm = np.linalg.norm(arm - along[:, None] * impact, axis=1)
+    return {"ids": np.asarray(drop_orientations)[:, 0].astype(int), "angles": angles,
+            "impact_direction": impact, "contact": contact,
+            "contact_point": coords[contact], "support_distance": support_distance,
+            "lever_arm": lever_arm}
+
+
+# 指标名 -> (取值函数, 越大越危险)
+METRICS = {
+    # 重心正对接触点时冲击能量最集中（角、棱跌落）
+    "lever_arm": (lambda e: e["lever_arm"], False),
+    "support_distance": (lambda e: e["support_distance"], True),
+}
+
+
+def rank_orientations(evaluation, metric="lever_arm", descending=None):
+    # metric 可以是 METRICS 中的名字或 evaluation -> 分数 的函数；返回从最危险开始的下标
+    if callable(metric):
+        score, worst_high = metric, True
+    elif metric in METRICS:
+        score, worst_high = METRICS[metric]
+    else:
+        raise ValueError(f"Unknown metric '{metric}' (expected one of {', '.join(METRICS)})")
+    if descending is not None:
+        worst_high = descending
+    scores = np.asarray(score(evaluation), dtype=float)
+    order = np.argsort(-scores if worst_high else scores, kind="stable")
+    return order, scores
+
+
+def write_ranking(file_name, evaluation, order, scores, node_ids):
+    with open(file_name, "w") as f:
+        f.write("rank,id,xn,yn,zn,score,lever_arm,support_distance,contact_node,cx,cy,cz\n")
+        for rank, i in enumerate(order):
+            xn, yn, zn = evaluation["angles"][i]
+            cx, cy, cz = evaluation["contact_point"][i]
+            f.write(f"{rank},{evaluation['ids'][i]},{xn:.6f},{yn:.6f},{zn:.6f},{scores[i]:.6g},"
+                    f"{evaluation['lever_arm'][i]:.6f},{evaluation['support_distance'][i]:.6f},"
+                    f"{int(node_ids[evaluation['contact'][i]])},{cx:.6f},{cy:.6f},{cz:.6f}\n")
+
+
+def run_sweep(model_path, init_path, mode="sphere", density=1000, metric="lever_arm", top=10,
+              drop_height=None, output_dir=None, output_mode="full", incremental=False, clean_stale=False,
+              log=print, report=None):
+    system_model, o, ground_width = load_model(model_path, log, report)
+    coords = system_model[:, 1:4]
+    init_content, drop_height, velocity = load_drop_velocity(init_path, drop_height, log, report)
+
+    drop_orientations = sample_orientations(mode, density)
+    with stage(report, "support_index", nodes=len(coords)):
+        index = load_support_index(model_path, coords)
+    with stage(report, "evaluate", orientations=len(drop_orientations)):
+        evaluation = evaluate_orientations(coords, o, drop_orientations, index)
+        order, scores = rank_orientations(evaluation, metric)
+    log(f"Evaluated {len(drop_orientations)} {mode} orientations using {len(index.vertices)} support points")
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    ranking_file = f"{deck_base_name(init_path, output_dir)}_sweep_{mode}_{metric if isinstance(metric, str) else 'custom'}.csv"
+    write_ranking(ranking_file, evaluation, order, scores, system_model[:, 0])
+
+    # 只为 top-N 生成完整文件，按危险程度排序。候选方向相互独立，每个方向都从 o 出发放置地面：
+    # 地面垂直于单位冲击方向，距离为排序时的 support_distance，与排序的接触点相接；
+    # 不使用 place_orientations 的累积平移，排序集合变化时已有方向的文件内容不变（--incremental）
+    top_rows = order[:top]
+    selected = drop_orientations[top_rows].copy()
+    selected[:, 1:4] = evaluation["impact_direction"][top_rows]
+    with stage(report, "placement", orientations=len(selected)):
+        p_new = o + (evaluation["support_distance"][top_rows] + 0.0001)[:, None] * selected[:, 1:4]
+        results = [{"angle": tuple(angle), "p_new": pn, "speed": velocity * angle}
+                   for angle, pn in zip(selected[:, 1:4], p_new)]
+    with stage(report, "write") as s:
+        manifest = open_manifest(model_path, init_path, init_content, drop_height, output_dir, output_mode) \
+            if incremental else None
+        file_names = write_decks(init_path, init_content, selected, results, ground_width, output_dir, output_mode,
+                                 manifest)
+        if manifest is not None:
+            finish_manifest(manifest, clean_stale, log)
+        s.add(files=len(file_names) + 1, bytes=written_bytes(file_names + [ranking_file]))
+    log(f"Wrote ranking to {ranking_file} and {len(file_names)} decks for the worst orientations")
+    return {"files": file_names, "ranking": ranking_file, "evaluation": evaluation,
+            "order": order, "scores": scores}
@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from support_index import convex_hull
+
+# 绘图前先抽稀数据，再在后台线程中离屏（Agg）渲染到文件，生成和检查流程不等待 matplotlib
+#   时间历程: LTTB 降采样，超标区间的起止点始终保留
+#   节点云:   体素抽稀（每个体素保留一个节点），或凸包顶点
+# 后台线程只使用 matplotlib 的面向对象接口（Figure + FigureCanvasAgg），不经过 pyplot
+# matplotlib 和 scipy 都在第一次绘图时才导入，不绘图的命令行运行不付出这部分启动时间
+
+HISTORY_POINTS = 2000
+MODEL_POINTS = 20000
+GROUND_POINTS = 5000
+
+_executor = None
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets，返回保留的下标（含首尾点）
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area)) if hi > lo else lo
+        keep[i + 1] = a
+    return np.unique(keep)
+
+
+def downsample_history(time, values, n_out=HISTORY_POINTS, exceed=None):
+    # values 为若干条同长度的曲线；exceed 为超标的布尔数组，其每段连续超标的起止点都保留
+    keep = [lttb(time, v, n_out) for v in values]
+    if exceed is not None and exceed.any():
+        change = np.flatnonzero(np.diff(exceed.astype(np.int8))) + 1
+        runs = np.concatenate([[0], change, [len(exceed)]])
+        starts = runs[:-1][exceed[runs[:-1]]]
+        ends = runs[1:][exceed[runs[:-1]]] - 1
+        # 间隔小于一个 LTTB 桶的超标段合并，保留的点数与 n_out 同量级
+        joined = np.flatnonzero(starts[1:] - ends[:-1] > len(time) / max(n_out, 1))
+        keep += [starts[np.concatenate([[0], joined + 1])], ends[np.concatenate([joined, [len(ends) - 1]])]]
+    return np.unique(np.concatenate(keep)) if keep else np.arange(len(time))
+
+
+def decimate_points(coords, max_points=MODEL_POINTS, method="voxel"):
+    # 返回不超过 max_points 个节点的下标
+    n = len(coords)
+    if n <= max_points:
+        return np.arange(n)
+    candidates = np.arange(n)
+    hull_class = convex_hull() if method == "hull" else None
+    if hull_class is not None:
+        try:
+            candidates = np.unique(hull_class(coords).vertices)
+        except Exception:
+            pass  # 退化（例如所有点共面）时按体素抽稀
+        if len(candidates) <= max_points:
+            return candidates
+    points = coords[candidates]
+    lo = points.min(axis=0)
+    span = float(np.max(points.max(axis=0) - lo)) or 1.0
+    # 网格模型的节点大多在表面上，占用的体素数约与分辨率的平方成正比
+    k = np.sqrt(max_points)
+    best = None
+    for _ in range(6):
+        cells = np.floor((points - lo) / (span / k)).astype(np.int64)
+        dims = cells.max(axis=0) + 1
+        _, first = np.unique(np.ravel_multi_index(cells.T, dims), return_index=True)
+        if len(first) <= max_points and (best is None or len(first) > len(best)):
+            best = first
+        if max_points * 0.9 <= len(first) <= max_points:
+            break
+        k *= np.sqrt(max_points / len(first)) * 0.98
+    if best is None:
+        best = first[np.linspace(0, len(first) - 1, max_points).astype(np.int64)]
+    return candidates[np.sort(best)]
+
+
+def _figure(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_history(file_name, series, threshold=0.05, numerator="ALLAE", denominator="ETOTAL",
+                   n_out=HISTORY_POINTS, dpi=100):
+    # series 为 {(step, region): (n, 3) 数组 time, numerator, denominator}（即 check_energy 的 result["series"]）
+    fig = _figure((10, 6))
+    ax = fig.add_subplot(111)
+    several = len(series) > 1
+    for (step, region), data in series.items():
+        time, allae, etotal = data[:, 0], data[:, 1], data[:, 2]
+        keep = downsample_history(time, [allae, etotal], n_out, allae > threshold * etotal)
+        time, allae, etotal = time[keep], allae[keep], etotal[keep]
+        suffix = f" {step}, {region}" if several else ""
+        ax.plot(time, allae, label=f"Hourglass Energy ({numerator}){suffix}", color=None if several else "red")
+        ax.plot(time, etotal, label=f"Total Energy ({denominator}){suffix}", color=None if several else "blue")
+        ax.plot(time, threshold * etotal, label=f"{threshold * 100:g}% of {denominator}{suffix}",
+                color=None if several else "green", linestyle="--")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Energy")
+    ax.set_title("Energy Analysis from ODB File")
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(file_name, dpi=dpi)
+    return file_name
+
+
+def render_model(file_name, coords, max_points=MODEL_POINTS, method="voxel", dpi=100):
+    keep = decimate_points(coords, max_points, method)
+    fig = _figure((8, 8))
+    ax = fig.add_subplot(111, projection="3d")
+    ax.scatter(coords[keep, 0], coords[keep, 1], coords[keep, 2], c="b", marker="o", s=2)
+    ax.set_xlabel("X (mm)")
+    ax.set_ylabel("Y (mm)")
+    ax.set_zlabel("Z (mm)")
+    ax.set_title(f"System Model 3D Visualization ({len(keep)} of {len(coords)} nodes)")
+    fig.savefig(file_name, dpi=dpi)
+    return file_name
+
+
+def ground_circle(p_new, normal, radius, samples=100):
+    # 垂直于法向、以 p_new 为圆心的圆
+    theta = np.linspace(0, 2 * np.pi, samples)
+    u = np.cross(normal, [1, 0, 0]) if not np.allclose(normal, [1, 0, 0]) else np.cross(normal, [0, 1, 0])
+    u = u / (np.linalg.norm(u) + 1e-10)  # Avoid division by zero
+    v = np.cross(normal, u)
+    v = v / (np.linalg.norm(v) + 1e-10)
+    return p_new + radius * (np.cos(theta)[:, None] * u + np.sin(theta)[:, None] * v)
+
+
+def render_grounds(file_name, coords, results, normals, ground_width, max_points=GROUND_POINTS, dpi=60):
+    # 每个方向一个子图：模型（随 p_new 平移）、地面圆和速度方向；所有子图共用同一组抽稀后的节点
+    keep = decimate_points(coords, max_points)
+    points = coords[keep]
+    num_orientations = len(results)
+    cols = int(np.ceil(np.sqrt(num_orientations)))
+    rows = int(np.ceil(num_orientations / cols))
+    fig = _figure((5 * cols, 5 * rows))
+    for i, (result, normal) in enumerate(zip(results, normals)):
+        p_new = result["p_new"]
+        speed = result["speed"]
+        current = points + (p_new - results[0]["p_new"])
+        ax = fig.add_subplot(rows, cols, i + 1, projection="3d")
+        ax.scatter(current[:, 0], current[:, 1], current[:, 2], c="b", marker="o", s=2, label="System Model")
+        circle = ground_circle(p_new, normal, ground_width / 2)
+        ax.plot(circle[:, 0], circle[:, 1], circle[:, 2], c="gray", label="Ground")
+        ax.quiver(p_new[0], p_new[1], p_new[2], speed[0], speed[1], speed[2], color="r", label="Velocity")
+        ax.set_xlabel("X (mm)")
+        ax.set_ylabel("Y (mm)")
+        ax.set_zlabel("Z (mm)")
+        ax.set_title(f"Orientation {i}")
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(file_name, dpi=dpi)
+    return file_name
+
+
+def render_async(func, *args, **kwargs):
+    # 在唯一的后台渲染线程中执行，返回 Future（result() 为输出文件名）；程序退出前会等待未完成的渲染
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+    return _executor.submit(func, *args, **kwargs)
+
+
+def wait_renders():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
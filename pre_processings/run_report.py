@@ -0,0 +1,173 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# 运行记录：每个阶段（解析、尺寸、方向放置、写文件、tie 检查 ...）的耗时、内存和处理量，
+# 运行结束后写成 JSON，不需要 profiler 就能看出时间花在哪里。
+#   report = RunReport("run_simulation", log=self.log_message)
+#   with report.stage("parse", bytes=os.path.getsize(path)) as s:
+#       nodes = ...
+#       s.add(nodes=len(nodes))
+#   report.save("run_report.json")
+# report.log 限流，只用于数量不定的进度和跳过/警告消息；检查结果和状态行用 report.result，不会被省略
+# 内存: 进程的峰值 RSS（有 resource 模块时）；AI_CAE_TRACE_MEMORY=1 时另外用 tracemalloc 记录每个阶段
+# 内 Python/numpy 分配的峰值（会明显变慢）
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    # 进程到目前为止的最大常驻内存（字节），不支持的平台返回 None
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RateLimitedLog:
+    # 令牌桶限流：短时间内最多 burst 条，之后每秒 rate 条，其余只计数，
+    # 在下一条可以输出的消息之前（或 flush 时）汇总为一行
+    def __init__(self, log=print, rate=20, burst=50):
+        self.log = log
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.suppressed = 0
+        self.total_suppressed = 0
+
+    def __call__(self, message):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            self.suppressed += 1
+            self.total_suppressed += 1
+            return
+        self.tokens -= 1
+        self.flush()
+        self.log(message)
+
+    def flush(self):
+        if self.suppressed:
+            self.log(f"... {self.suppressed} log messages suppressed")
+            self.suppressed = 0
+
+
+class Stage:
+    def __init__(self, name, counters=None):
+        self.name = name
+        self.counters = dict(counters or {})
+        self.seconds = 0.0
+        self.peak_rss = None
+        self.traced_peak = None
+        self.error = None
+
+    def add(self, **counters):
+        # 累加处理量，例如 bytes、lines、nodes、files
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def as_dict(self):
+        data = {"name": self.name, "seconds": self.seconds, "counters": self.counters}
+        rates = {f"{key}_per_second": value / self.seconds for key, value in self.counters.items()
+                 if self.seconds > 0 and isinstance(value, (int, float))}
+        if rates:
+            data["rates"] = rates
+        if self.peak_rss is not None:
+            data["peak_rss_mb"] = self.peak_rss / 1024 ** 2
+        if self.traced_peak is not None:
+            data["traced_peak_mb"] = self.traced_peak / 1024 ** 2
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class RunReport:
+    def __init__(self, name, log=print, trace_memory=None, rate=20, burst=50):
+        self.name = name
+        self.log = RateLimitedLog(log, rate, burst)
+        if trace_memory is None:
+            trace_memory = os.environ.get("AI_CAE_TRACE_MEMORY", "") not in ("", "0")
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.started = time.time()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **counters):
+        stage = Stage(name, counters)
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield stage
+        except BaseException as e:
+            stage.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stage.seconds = time.perf_counter() - start
+            stage.peak_rss = peak_rss()
+            if tracing:
+                stage.traced_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.stages.append(stage)
+
+    def to_dict(self):
+        return {"name": self.name, "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "seconds": time.perf_counter() - self._start, "pid": os.getpid(),
+                "peak_rss_mb": peak_rss() / 1024 ** 2 if peak_rss() is not None else None,
+                "suppressed_log_messages": self.log.total_suppressed,
+                "stages": [stage.as_dict() for stage in self.stages]}
+
+    def summary(self):
+        messages = []
+        for stage in self.stages:
+            parts = [f"{stage.seconds:.3f} s"]
+            for key, value in stage.counters.items():
+                if key == "bytes":
+                    parts.append(f"{value / 1024 ** 2:.1f} MB")
+                    if stage.seconds > 0:
+                        parts.append(f"{value / 1024 ** 2 / stage.seconds:.1f} MB/s")
+                else:
+                    parts.append(f"{value} {key}")
+            if stage.peak_rss is not None:
+                parts.append(f"peak RSS {stage.peak_rss / 1024 ** 2:.0f} MB")
+            if stage.traced_peak is not None:
+                parts.append(f"traced peak {stage.traced_peak / 1024 ** 2:.1f} MB")
+            messages.append(f"  {stage.name}: " + ", ".join(parts) + (" (failed)" if stage.error else ""))
+        total = time.perf_counter() - self._start
+        return [f"{self.name} stages ({total:.3f} s total):"] + messages
+
+    def result(self, message):
+        # 不受限流影响：先输出被省略的消息数，再输出 message
+        self.log.flush()
+        self.log.log(message)
+
+    def log_summary(self):
+        for message in self.summary():
+            self.result(message)
+
+    def save(self, path):
+        self.log.flush()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+        return path
+
+
+@contextmanager
+def stage(report, name, **counters):
+    # report 为 None 时只返回一个不记录的 Stage，调用方不必判断
+    if report is None:
+        yield Stage(name, counters)
+        return
+    with report.stage(name, **counters) as s:
+        yield s
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+
+from system_model import CACHE_DIR, cache_enabled, model_digest
+
+# 地面偏移 d 是所有节点在法向上投影的最大值，只有凸包顶点可能取到最大值。
+# 预先找出这些支撑点，再按方向分箱（立方体贴图），每个方向只需计算少量候选点。
+# scipy 可用时先求凸包；没有 scipy 时分箱本身也保证结果精确，但建立索引慢得多。
+# scipy.spatial 导入约需 0.3 s，只在第一次建立索引时导入
+ConvexHull = None
+
+RESOLUTION = 16
+INDEX_VERSION = 1
+
+
+def convex_hull():
+    # 返回 scipy.spatial.ConvexHull，没有 scipy 时返回 None
+    global ConvexHull
+    if ConvexHull is None:
+        try:
+            from scipy.spatial import ConvexHull
+        except ImportError:
+            ConvexHull = False
+    return ConvexHull or None
+
+
+def _face_grid(resolution):
+    # 立方体六个面上 resolution x resolution 的格子，返回格子中心方向和格子的最大半角
+    t = np.linspace(-1, 1, resolution + 1)
+    mid = (t[:-1] + t[1:]) / 2
+    centers, alphas = [], []
+    for axis in range(3):
+        others = [k for k in range(3) if k != axis]
+        for sign in (1.0, -1.0):
+            u, v = np.meshgrid(mid, mid, indexing="ij")
+            c = np.zeros((resolution, resolution, 3))
+            c[..., axis] = sign
+            c[..., others[0]], c[..., others[1]] = u, v
+            c /= np.linalg.norm(c, axis=-1, keepdims=True)
+            alpha = np.zeros((resolution, resolution))
+            for du in (0, 1):
+                for dv in (0, 1):
+                    corner = np.zeros((resolution, resolution, 3))
+                    corner[..., axis] = sign
+                    corner[..., others[0]], corner[..., others[1]] = np.meshgrid(t[du:resolution + du], t[dv:resolution + dv], indexing="ij")
+                    corner /= np.linalg.norm(corner, axis=-1, keepdims=True)
+                    cos = np.clip(np.sum(corner * c, axis=-1), -1, 1)
+                    alpha = np.maximum(alpha, np.arccos(cos))
+            centers.append(c.reshape(-1, 3))
+            alphas.append(alpha.ravel())
+    return np.vstack(centers), np.concatenate(alphas)
+
+
+def direction_bins(directions, resolution):
+    # 与 _face_grid 的编号一致：face = 2 * axis + (0 正 / 1 负)
+    directions = np.asarray(directions, dtype=float).reshape(-1, 3)
+    axis = np.argmax(np.abs(directions), axis=1)
+    rows = np.arange(len(directions))
+    major = directions[rows, axis]
+    face = 2 * axis + (major < 0)
+    others = np.array([[1, 2], [0, 2], [0, 1]])[axis]
+    uv = directions[rows[:, None], others] / np.abs(major)[:, None]
+    ij = np.clip(np.floor((uv + 1) / 2 * resolution).astype(np.int64), 0, resolution - 1)
+    return (face * resolution + ij[:, 0]) * resolution + ij[:, 1]
+
+
+def _bin_candidates(rel, centers, alphas, block_size=4 * 1024 * 1024):
+    # 对方向锥内任意 u，点 x 可能是支撑点的必要条件:
+    #   max_u x.u >= max_y min_u y.u
+    # 两侧都可以由 x 与锥中心的夹角和锥半角精确算出
+    norms = np.linalg.norm(rel, axis=1)
+    tol = 1e-9 * (norms.max() if len(norms) else 0.0)
+    cos_a, sin_a = np.cos(alphas), np.sin(alphas)
+    members = []
+    step = max(1, block_size // max(len(rel), 1))
+    for start in range(0, len(centers), step):
+        c = centers[start:start + step]
+        proj = rel @ c.T
+        perp = np.sqrt(np.maximum(norms[:, None] ** 2 - proj ** 2, 0))
+        ca, sa = cos_a[start:start + step], sin_a[start:start + step]
+        n = norms[:, None]
+        # θ < α 时上界为 |x|，θ + α > π 时下界为 -|y|
+        upper = np.where(proj > n * ca, n, proj * ca + perp * sa)
+        lower = np.where(proj < -n * ca, -n, proj * ca - perp * sa)
+        keep = upper >= lower.max(axis=0) - tol
+        members.extend(np.flatnonzero(keep[:, k]) for k in range(keep.shape[1]))
+    return members
+
+
+class SupportIndex:
+    def __init__(self, vertices, center, resolution, offsets, members):
+        self.vertices = vertices      # 节点下标（对应 coords 的行）
+        self.center = center
+        self.resolution = resolution
+        self.offsets = offsets        # 第 b 个方向箱的候选为 members[offsets[b]:offsets[b + 1]]
+        self.members = members        # vertices 的下标
+
+    @classmethod
+    def build(cls, coords, center=None, resolution=RESOLUTION, coarse_resolution=4):
+        coords = np.asarray(coords, dtype=np.float64)
+        center = np.mean(coords, axis=0) if center is None else np.asarray(center, dtype=np.float64)
+        rel = coords - center
+
+        # 支撑点只可能是凸包顶点；qhull 直接处理所有节点（1M 节点约 1 s）。
+        # 没有 scipy 或凸包退化（例如所有点共面）时用粗分箱代替，粗分箱对表面节点很多的模型几乎不缩减，慢得多
+        candidates = None
+        hull_class = convex_hull() if len(rel) > 4 else None
+        if hull_class is not None:
+            try:
+                candidates = np.unique(hull_class(rel).vertices)
+            except Exception:
+                candidates = None
+        if candidates is None:
+            centers, alphas = _face_grid(coarse_resolution)
+            candidates = np.unique(np.concatenate(_bin_candidates(rel, centers, alphas)))
+
+        centers, alphas = _face_grid(resolution)
+        members = _bin_candidates(rel[candidates], centers, alphas)
+        offsets = np.zeros(len(members) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(m) for m in members])
+        return cls(candidates.astype(np.int64), center, resolution, offsets,
+                   np.concatenate(members).astype(np.int64))
+
+    def support(self, coords, p, normals):
+        # 返回每个法向的 d（与全节点扫描相同：最大正投影，没有则为 0）和取到最大值的节点下标
+        normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+        d = np.zeros(len(normals))
+        contact = np.zeros(len(normals), dtype=np.int64)
+        bins = direction_bins(normals, self.resolution)
+        order = np.argsort(bins, kind="stable")
+        bounds = np.flatnonzero(np.diff(bins[order])) + 1
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            b = bins[group[0]]
+            nodes = self.vertices[self.members[self.offsets[b]:self.offsets[b + 1]]]
+            if not len(nodes):
+                nodes = self.vertices
+            distances = (coords[nodes] - p) @ normals[group].T
+            best = np.argmax(distances, axis=0)
+            d[group] = np.maximum(distances[best, np.arange(len(group))], 0)
+            contact[group] = nodes[best]
+        return d, contact
+
+    def save(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, vertices=self.vertices, center=self.center, resolution=self.resolution,
+                     offsets=self.offsets, members=self.members)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["vertices"], data["center"], int(data["resolution"]),
+                       data["offsets"], data["members"])
+
+
+def load_support_index(model_path, coords, resolution=RESOLUTION, cache_dir=None, use_cache=None, build=True):
+    # 与解析后的节点缓存放在同一目录，按相同的内容 hash 命名
+    # build=False 时只读取已缓存的索引，没有（或不使用缓存）时返回 None
+    if use_cache is None:
+        use_cache = cache_enabled()
+    if not use_cache:
+        return SupportIndex.build(coords, resolution=resolution) if build else None
+    cache_dir = cache_dir or CACHE_DIR
+    digest = model_digest(model_path, cache_dir)
+    path = os.path.join(cache_dir, f"{digest}.support-r{resolution}-v{INDEX_VERSION}.npz")
+    if os.path.exists(path):
+        try:
+            return SupportIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    if not build:
+        return None
+    index = SupportIndex.build(coords, resolution=resolution)
+    os.makedirs(cache_dir, exist_ok=True)
+    index.save(path)
+    return index
@@ -0,0 +1,377 @@
+import hashlib
+import json
+import os
+import shutil
+import warnings
+
+import numpy as np
+
+# 按块读取 system model，*node 块内的数据行批量解析
+CHUNK_SIZE = 16 * 1024 * 1024
+SKIP_REASONS = ("unexpected characters", "non-numeric", "wrong number of values")
+
+_DIGIT = np.zeros(256, dtype=bool)
+_DIGIT[ord("0"):ord("9") + 1] = True
+_ALLOWED = _DIGIT.copy()
+_ALLOWED[list(b"., -\n")] = True
+
+
+def _parse_line(line):
+    # 与原来逐行解析的规则一致，返回 (values, None) / (None, reason) / (None, None)
+    if not line or not line[0].isdigit():
+        return None, None
+    parts = line.replace(",", " ").split()
+    if len(parts) != 4:
+        return None, "wrong number of values"
+    try:
+        values = [float(x) for x in parts]
+    except ValueError:
+        return None, "non-numeric"
+    if not all(c.isdigit() or c in "., -" for c in line):
+        return None, "unexpected characters"
+    return values, None
+
+
+class NodeReader:
+    def __init__(self, capacity=1024, max_examples=5):
+        self.nodes = np.empty((max(capacity, 1), 4), dtype=np.float64)
+        self.count = 0
+        self.skipped = dict.fromkeys(SKIP_REASONS, 0)
+        self.examples = []
+        self.max_examples = max_examples
+        self.in_block = False
+        self.line_no = 0
+
+    def _append(self, values):
+        n = len(values)
+        if self.count + n > len(self.nodes):
+            capacity = max(self.count + n, int(len(self.nodes) * 1.5))
+            self.nodes.resize((capacity, 4), refcheck=False)
+        self.nodes[self.count:self.count + n] = values
+        self.count += n
+
+    def _skip(self, reason, line_no, line):
+        self.skipped[reason] += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append((line_no, reason, line))
+
+    def _parse_segment(self, seg, line_no):
+        # seg 由完整的数据行组成（以 \n 结尾），line_no 为其前面的行数
+        buf = np.frombuffer(seg, dtype=np.uint8)
+        line_end = np.flatnonzero(buf == 10)
+        n_lines = len(line_end)
+        line_start = np.empty(n_lines, dtype=np.int64)
+        line_start[:1] = 0
+        line_start[1:] = line_end[:-1] + 1
+
+        sep = (buf == 32) | (buf == 44) | (buf == 10)
+        token_start = ~sep
+        token_start[1:] &= sep[:-1]
+        token_pos = np.flatnonzero(token_start)
+        first_token = np.searchsorted(token_pos, line_start)
+        tokens_per_line = np.searchsorted(token_pos, line_end) - first_token
+
+        # 行首第一个非空格字符必须是数字（逗号开头的行与原逻辑一样被忽略）
+        comma_pos = np.flatnonzero(buf == 44)
+        first_comma = np.searchsorted(comma_pos, line_start)
+        has_token = tokens_per_line > 0
+        first_char = np.full(n_lines, len(buf), dtype=np.int64)
+        first_char[has_token] = token_pos[first_token[has_token]]
+        comma_first = np.zeros(n_lines, dtype=bool)
+        inside = first_comma < len(comma_pos)
+        comma_first[inside] = comma_pos[first_comma[inside]] < first_char[inside]
+        is_data = has_token & ~comma_first
+        is_data[is_data] = _DIGIT[buf[first_char[is_data]]]
+
+        # 含非法字符（含制表符、\r 以外的行尾空白等）的行交给逐行解析，保证结果与原规则一致
+        bad_chars = np.zeros(n_lines, dtype=bool)
+        bad_chars[np.searchsorted(line_end, np.flatnonzero(~_ALLOWED[buf]))] = True
+
+        # "1-2"、"1.2.3" 这类 token 无法可靠地批量解析
+        minus_pos = np.flatnonzero(buf == 45)
+        bad_chars[np.searchsorted(line_end, minus_pos[~token_start[minus_pos]])] = True
+        dot_token = np.searchsorted(token_pos, np.flatnonzero(buf == 46), side="right") - 1
+        multi_dot = dot_token[1:][dot_token[1:] == dot_token[:-1]]
+        bad_chars[np.searchsorted(line_end, token_pos[multi_dot])] = True
+
+        fast = is_data & ~bad_chars & (tokens_per_line == 4)
+        slow = (is_data | bad_chars) & ~fast
+
+        values = None
+        if fast.any():
+            text = seg
+            masked = np.flatnonzero(has_token & ~fast)
+            if len(masked):
+                arr = buf.copy()
+                for k in masked:
+                    arr[line_start[k]:line_end[k]] = 32
+                text = arr.tobytes()
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    values = np.fromstring(text.replace(b",", b" "), dtype=np.float64, sep=" ")
+            except ValueError:
+                values = np.empty(0)
+            if len(values) == 4 * np.count_nonzero(fast):
+                values = values.reshape(-1, 4)
+            else:
+                # 例如单独的 "-" 或 "."，整段交给逐行解析以得到准确的跳过原因
+                values = None
+                slow |= fast
+                fast[:] = False
+        if not slow.any():
+            if values is not None:
+                self._append(values)
+            return
+
+        slow_values = []
+        slow_rows = []
+        for k in np.flatnonzero(slow):
+            line = seg[line_start[k]:line_end[k]].decode("utf-8", "replace").strip()
+            row, reason = _parse_line(line)
+            if row is not None:
+                slow_values.append(row)
+                slow_rows.append(k)
+            elif reason is not None:
+                self._skip(reason, line_no + k + 1, line)
+        if not slow_values:
+            if values is not None:
+                self._append(values)
+            return
+        if values is None:
+            self._append(np.array(slow_values, dtype=np.float64))
+            return
+        # 保持文件中的原始顺序
+        rows = np.concatenate([np.flatnonzero(fast), np.array(slow_rows)])
+        merged = np.vstack([values, np.array(slow_values, dtype=np.float64)])
+        self._append(merged[np.argsort(rows, kind="stable")])
+
+    def _keyword_lines(self, chunk):
+        # 关键字行（去掉行首空白后以 * 开头）的 (start, end)
+        star = chunk.find(b"*")
+        while star >= 0:
+            start = chunk.rfind(b"\n", 0, star) + 1
+            end = chunk.find(b"\n", star) + 1
+            if not chunk[start:star].strip(b" \t\f\v"):
+                yield start, end
+            star = chunk.find(b"*", end)
+
+    def feed(self, chunk):
+        # chunk 必须以完整的行结尾
+        chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        pos = 0
+        line_no = self.line_no
+        for start, end in self._keyword_lines(chunk):
+            if self.in_block and start > pos:
+                self._parse_segment(chunk[pos:start], line_no)
+            line_no += chunk.count(b"\n", pos, end)
+            pos = end
+            keyword = chunk[start:end].strip()
+            if self.in_block:
+                if not keyword.startswith(b"**") and not keyword.startswith(b"*node"):
+                    self.in_block = False
+            elif keyword.startswith(b"*node"):
+                self.in_block = True
+        if self.in_block and pos < len(chunk):
+            self._parse_segment(chunk[pos:], line_no)
+        self.line_no += chunk.count(b"\n")
+
+    def result(self):
+        self.nodes.resize((self.count, 4), refcheck=False)
+        return self.nodes, {"skipped": self.skipped, "examples": self.examples}
+
+
+def _read_node_blocks(index, reader, chunk_size):
+    # 按关键字索引只读 *node 块，块内按 chunk_size 分段（在换行处切开）
+    data = index.open()
+    for k in index.find(match=lambda keyword: keyword.startswith("*node")):
+        reader.line_no = k.line
+        reader.in_block = True
+        pos = k.end
+        while pos < k.data_end:
+            cut = min(pos + chunk_size, k.data_end)
+            if cut < k.data_end:
+                cut = data.rfind(b"\n", pos, cut) + 1 or data.find(b"\n", cut, k.data_end) + 1 or k.data_end
+            segment = data[pos:cut]
+            reader.feed(segment if segment.endswith(b"\n") else segment + b"\n")
+            pos = cut
+    reader.in_block = False
+
+
+def read_nodes(file_path, chunk_size=CHUNK_SIZE, max_examples=5, index=None):
+    # 返回 (nodes, report)，nodes 为 (n, 4) float64 数组: id, x, y, z
+    # 给出关键字索引（keyword_index.KeywordIndex）时直接 memory-map 到 *node 块，不扫描其余内容
+    if index is not None and not index.files[0]["lone_cr"]:
+        reader = NodeReader(capacity=index.files[0]["size"] // 40, max_examples=max_examples)
+        _read_node_blocks(index, reader, chunk_size)
+        return reader.result()
+
+    with open(file_path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(0)
+        # 每行约 40 字节，预分配后按需扩容
+        reader = NodeReader(capacity=size // 40, max_examples=max_examples)
+        tail = b""
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = tail + data
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                tail = data
+                continue
+            tail = data[cut:]
+            reader.feed(data[:cut])
+        if tail:
+            reader.feed(tail + b"\n")
+    return reader.result()
+
+
+def format_skip_report(report):
+    # 汇总被跳过的行，替代逐行日志
+    total = sum(report["skipped"].values())
+    if not total:
+        return []
+    counts = ", ".join(f"{reason}: {n}" for reason, n in report["skipped"].items() if n)
+    messages = [f"Skipped {total} invalid lines in *node blocks ({counts})"]
+    for line_no, reason, line in report["examples"]:
+        messages.append(f"  line {line_no} ({reason}): {line}")
+    return messages
+
+
+# ---- 解析结果缓存 ----
+# 缓存目录中每个模型对应 <hash>.npy（节点数组，可 memory-map）和 <hash>.json（元数据），
+# index.json 记录 路径 -> (size, mtime, hash)，文件未变化时无需重新计算 hash
+CACHE_DIR = os.environ.get("AI_CAE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ai-cae"))
+CACHE_MAX_BYTES = int(float(os.environ.get("AI_CAE_CACHE_MAX_BYTES", 20 * 1024 ** 3)))
+PARSER_VERSION = 1
+
+
+def cache_enabled():
+    # AI_CAE_NO_CACHE=1 时所有缓存（节点、关键字索引、支撑点索引、manifest 的 hash 记录）都不读写
+    return os.environ.get("AI_CAE_NO_CACHE", "") in ("", "0")
+
+
+def file_digest(file_path, block_size=8 * 1024 * 1024):
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return f"{h.hexdigest()}-v{PARSER_VERSION}"
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def model_digest(file_path, cache_dir=None):
+    # 路径、大小和 mtime 都未变化时直接使用记录的 hash，否则重新计算内容 hash
+    cache_dir = cache_dir or CACHE_DIR
+    st = os.stat(file_path)
+    key = os.path.abspath(file_path)
+    index_path = os.path.join(cache_dir, "index.json")
+    index = _read_json(index_path, {})
+    entry = index.get(key)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns \
+            and entry["digest"].endswith(f"-v{PARSER_VERSION}"):
+        return entry["digest"]
+    digest = file_digest(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _read_json(index_path, {})
+    index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest}
+    _write_json(index_path, index)
+    return digest
+
+
+def load_nodes(file_path, cache_dir=None, use_cache=None, max_bytes=None):
+    # 与 read_nodes 返回值相同；命中缓存时节点数组为只读 memory-map
+    if use_cache is None:
+        use_cache = cache_enabled()
+    if not use_cache:
+        return read_nodes(file_path)
+
+    cache_dir = cache_dir or CACHE_DIR
+    digest = model_digest(file_path, cache_dir)
+    npy_path = os.path.join(cache_dir, f"{digest}.npy")
+    meta_path = os.path.join(cache_dir, f"{digest}.json")
+    meta = _read_json(meta_path, None)
+    if meta is not None and os.path.exists(npy_path):
+        try:
+            nodes = np.load(npy_path, mmap_mode="r")
+        except (OSError, ValueError):
+            nodes = None
+        if nodes is not None:
+            os.utime(meta_path)  # LRU 淘汰按最近使用时间
+            return nodes, meta["report"]
+
+    # 关键字索引同时缓存，之后的 *tie 等检查可直接定位到各自的块
+    from keyword_index import load_keyword_index
+    nodes, report = read_nodes(file_path, index=load_keyword_index(file_path, cache_dir))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{npy_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, nodes)
+    os.replace(tmp, npy_path)
+    _write_json(meta_path, {"source": os.path.abspath(file_path), "nodes": len(nodes), "report": report})
+    evict_cache(cache_dir, max_bytes)
+    return nodes, report
+
+
+def _cache_entries(cache_dir):
+    # 按 hash 分组的缓存文件，返回 [(last_used, size, [paths])]，最久未使用的在前
+    groups = {}
+    for name in os.listdir(cache_dir):
+        if name == "index.json" or name.endswith(".tmp"):
+            continue
+        path = os.path.join(cache_dir, name)
+        groups.setdefault(name.split(".", 1)[0], []).append(path)
+    entries = []
+    for digest, paths in groups.items():
+        try:
+            stats = [os.stat(p) for p in paths]
+        except OSError:
+            continue
+        entries.append((max(s.st_mtime for s in stats), sum(s.st_size for s in stats), paths))
+    entries.sort()
+    return entries
+
+
+def evict_cache(cache_dir=None, max_bytes=None):
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = _cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    # 最近一次写入的条目保留，即使它本身超过上限
+    for _, size, paths in entries[:-1]:
+        if total <= max_bytes:
+            break
+        for p in paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear_cache(cache_dir=None):
+    cache_dir = cache_dir or CACHE_DIR
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
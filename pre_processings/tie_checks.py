@@ -0,0 +1,243 @@
+import argparse
+import os
+import re
+import sys
+from collections import namedtuple
+
+from keyword_index import iter_block_lines, load_keyword_index
+
+# *tie 检查：一次遍历找出重复、交换以及在不同 tie 中重复使用的面，并可输出修正后的文件
+#   python tie_checks.py model.txt              只检查
+#   python tie_checks.py model.txt --fix out.txt 检查并写出去掉重复和交换对的文件
+# 重复和交换只在同一个 tie 名字内判断和删除；同一对出现在不同的 tie 中只作为警告报告
+# line 为行号（从 1 开始），offset/end 为该数据行在文件中的字节范围（含换行符），block 为所在 *tie 关键字行的起始字节
+TiePair = namedtuple("TiePair", "name a b line offset end block", defaults=(None, None, None))
+
+_SEPARATORS = re.compile(r"[,\s]+")
+_NAME = re.compile(r"name\s*=\s*([^,]+)", re.I)
+
+
+def tie_name(keyword_line):
+    m = _NAME.search(keyword_line)
+    return m.group(1).strip() if m else ""
+
+
+def split_pair(line):
+    # "a,b"、"a b"、"a , b" 都视为同一对，返回 (a, b)；少于两个面时返回 None
+    parts = [part for part in _SEPARATORS.split(line.strip()) if part]
+    if len(parts) < 2:
+        return None
+    return parts[0], parts[1]
+
+
+_TIE = re.compile(r"\*tie\s*(,|$)", re.I)
+
+
+def _tie_pair(name, line_no, start, end, raw, errors, block=None):
+    line = raw.strip()
+    if not line or line.startswith(b"**"):
+        return None
+    text = line.decode("utf-8", "replace")
+    pair = split_pair(text)
+    if pair is None:
+        if errors is None:
+            raise ValueError(f"No space or comma found in line '{text}' at line {line_no}")
+        errors.append((line_no, text))
+        return None
+    return TiePair(name, pair[0], pair[1], line_no, start, end, block)
+
+
+def iter_tie_pairs(file_path, errors=None, index=None):
+    # 流式读取所有 *tie 块的每一个数据行（注释行跳过，遇到其他关键字结束），内存占用与文件大小无关
+    # errors 为 list 时无法拆分的数据行以 (line, text) 记录在其中，否则抛出 ValueError
+    # 给出关键字索引（keyword_index.KeywordIndex）时直接 memory-map 到各个 *tie 块
+    if index is not None:
+        data = index.open()
+        for k in index.find(match=_TIE.match):
+            name = tie_name(k.keyword)
+            for line_no, start, end, raw in iter_block_lines(data, k):
+                pair = _tie_pair(name, line_no, start, end, raw, errors, k.start)
+                if pair is not None:
+                    yield pair
+        return
+
+    name = block = None
+    offset = 0
+    with open(file_path, "rb") as f:
+        for line_no, raw in enumerate(f, 1):
+            start, offset = offset, offset + len(raw)
+            line = raw.strip()
+            if line.startswith(b"*") and not line.startswith(b"**"):
+                keyword = line.decode("utf-8", "replace")
+                name = tie_name(keyword) if _TIE.match(keyword) else None
+                block = start
+                continue
+            if name is not None:
+                pair = _tie_pair(name, line_no, start, offset, raw, errors, block)
+                if pair is not None:
+                    yield pair
+
+
+class TieIssueTracker:
+    # 逐个加入 tie 对，add 返回 "duplicate"、"swap"（与同名 tie 中前面的某一对相同）或 None
+    def __init__(self):
+        self.ties = {}
+        self.first_seen = {}      # (tie 名字, 面对) -> 第一次出现
+        self.pair_ties = {}       # 面对 -> 在任意 tie 中的第一次出现
+        self.repeated = []        # 在不同 tie 中重复的对 (pair, first)，不删除
+        self.surface_ties = {}
+
+    def add(self, pair):
+        group = self.ties.setdefault(pair.name, {"pairs": 0, "duplicates": [], "swaps": []})
+        group["pairs"] += 1
+        for surface in (pair.a, pair.b):
+            names = self.surface_ties.setdefault(surface, [])
+            if pair.name not in names:
+                names.append(pair.name)
+        key = (pair.a, pair.b) if pair.a <= pair.b else (pair.b, pair.a)
+        first = self.first_seen.get((pair.name, key))
+        if first is None:
+            self.first_seen[(pair.name, key)] = pair
+            other = self.pair_ties.setdefault(key, pair)
+            if other is not pair:
+                self.repeated.append((pair, other))
+            return None
+        if (first.a, first.b) == (pair.a, pair.b):
+            group["duplicates"].append((pair, first))
+            return "duplicate"
+        group["swaps"].append((pair, first))
+        return "swap"
+
+    def issues(self):
+        shared = {surface: names for surface, names in self.surface_ties.items() if len(names) > 1}
+        return {"ties": self.ties, "repeated_pairs": self.repeated, "shared_surfaces": shared}
+
+
+def find_tie_issues(pairs):
+    # 按 tie 名字分组返回:
+    #   {"ties": {name: {"pairs": n, "duplicates": [(pair, first)], "swaps": [(pair, first)]}},
+    #    "repeated_pairs": [(pair, first)], "shared_surfaces": {surface: [name, ...]}}
+    # first 为与 pair 冲突的第一次出现；repeated_pairs 中 first 在另一个 tie 中
+    tracker = TieIssueTracker()
+    for pair in pairs:
+        tracker.add(pair)
+    return tracker.issues()
+
+
+def _copy_range(src, dst, start, end, block_size=1024 * 1024):
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = src.read(min(block_size, remaining))
+        if not block:
+            break
+        dst.write(block)
+        remaining -= len(block)
+
+
+def correct_tie_deck(file_path, output_path=None, errors=None, index=None):
+    # 一次顺序读写，边读边复制：同名 tie 中重复的对和交换的对（与前面某一对相同）被删除，其余字节原样复制
+    # 不同 tie 中重复的对只报告，不删除。同名 tie 写在多个块中、某个块的所有对都与前面重复时，
+    # 整个 *tie 块（关键字行到最后一个数据行）删除，不留下空的 *tie 块
+    # 每个块结束（或出现第一个保留的对）时才决定；只有到目前为止全部要删除的对需要暂存
+    # 返回 (issues, removed, output_path)，removed 为删除的对数；删除的块记录在 issues["removed_blocks"]
+    if output_path is None:
+        base, ext = os.path.splitext(file_path)
+        output_path = f"{base}_corrected{ext}"
+    tracker = TieIssueTracker()
+    removed = 0
+    removed_blocks = []
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(file_path, "rb") as src, open(tmp, "wb") as dst:
+            copied = 0
+            block, pending, kept = None, [], False
+
+            def finish_block():
+                # 整个块都是重复的对：从关键字行删到最后一个数据行
+                nonlocal copied, removed
+                if pending and not kept:
+                    _copy_range(src, dst, copied, block)
+                    copied = pending[-1].end
+                    removed += len(pending)
+                    removed_blocks.append((pending[0].name, pending[0].line, pending[-1].line))
+
+            for pair in iter_tie_pairs(file_path, errors, index):
+                if pair.block != block:
+                    finish_block()
+                    block, pending, kept = pair.block, [], False
+                if tracker.add(pair) is None:
+                    if not kept:
+                        for skipped in pending:
+                            _copy_range(src, dst, copied, skipped.offset)
+                            copied = skipped.end
+                        removed += len(pending)
+                        pending, kept = [], True
+                elif kept:
+                    _copy_range(src, dst, copied, pair.offset)
+                    copied = pair.end
+                    removed += 1
+                else:
+                    pending.append(pair)
+            finish_block()
+            _copy_range(src, dst, copied, os.path.getsize(file_path))
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    issues = tracker.issues()
+    issues["removed_blocks"] = removed_blocks
+    return issues, removed, output_path
+
+
+def _where(pair, name):
+    return f"line {pair.line}" if pair.name == name else f"line {pair.line} in tie '{pair.name}'"
+
+
+def format_tie_report(issues):
+    messages = []
+    for name, group in issues["ties"].items():
+        messages.append(f"Tie '{name}': {group['pairs']} pairs, {len(group['duplicates'])} duplicate(s), "
+                        f"{len(group['swaps'])} swap(s)")
+        for pair, first in group["duplicates"]:
+            messages.append(f"  Duplicate: line {pair.line} ({pair.a}, {pair.b}) repeats {_where(first, name)}")
+        for pair, first in group["swaps"]:
+            messages.append(f"  Swap: line {pair.line} ({pair.a}, {pair.b}) swaps with {_where(first, name)} "
+                            f"({first.a}, {first.b})")
+    for pair, first in issues["repeated_pairs"]:
+        messages.append(f"Warning: line {pair.line} ({pair.a}, {pair.b}) in tie '{pair.name}' repeats "
+                        f"line {first.line} ({first.a}, {first.b}) in tie '{first.name}' (not removed)")
+    for name, first_line, last_line in issues.get("removed_blocks", []):
+        messages.append(f"Removed the *tie block of '{name}' with lines {first_line}-{last_line}: "
+                        f"all its pairs repeat earlier pairs of the same tie")
+    for surface, names in issues["shared_surfaces"].items():
+        messages.append(f"Surface '{surface}' is used in several ties: {', '.join(names)}")
+    return messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check *tie definitions for duplicates and swapped pairs.")
+    parser.add_argument("file", help="system model file")
+    parser.add_argument("--fix", metavar="OUTPUT", nargs="?", const="",
+                        help="also write a corrected file (default: <file>_corrected.<ext>)")
+    args = parser.parse_args(argv)
+
+    errors = []
+    index = load_keyword_index(args.file)
+    if args.fix is not None:
+        issues, removed, output_path = correct_tie_deck(args.file, args.fix or None, errors, index)
+    else:
+        issues = find_tie_issues(iter_tie_pairs(args.file, errors, index))
+    for line_no, text in errors:
+        print(f"Error: No space or comma found in line '{text}' at line {line_no}")
+    for message in format_tie_report(issues):
+        print(message)
+    if args.fix is not None:
+        print(f"Removed {removed} duplicate/swapped pairs, corrected file written to {output_path}")
+    found = any(group["duplicates"] or group["swaps"] for group in issues["ties"].values())
+    return 1 if errors or found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
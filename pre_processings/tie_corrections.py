@@ -1,5 +1,19 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+import os
+import sys
+from keyword_index import load_keyword_index
+from run_report import RunReport
+from tie_checks import iter_tie_pairs, find_tie_issues, correct_tie_deck, format_tie_report, main as check_main
+
+# tkinter 只在打开界面时导入；带参数运行时直接做命令行检查，不加载界面:
+#   python tie_corrections.py model.inp [--fix]     与 tie_checks.py 相同
+tk = filedialog = messagebox = scrolledtext = None
+
+
+def load_gui():
+    global tk, filedialog, messagebox, scrolledtext
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, scrolledtext
+
 
 class TieCorrectionApp:
     def __init__(self, root):
@@ -14,11 +28,15 @@ class TieCorrectionApp:
         tk.Entry(root, textvariable=self.file_path, width=50).pack()
         tk.Button(root, text="Browse", command=self.browse_file).pack(pady=5)
 
-        tk.Button(root, text="Run Check", command=self.run_check).pack(pady=10)
+        frame = tk.Frame(root)
+        tk.Button(frame, text="Run Check", command=self.run_check).pack(side=tk.LEFT)
+        tk.Button(frame, text="Write Corrected File", command=self.write_corrected).pack(side=tk.LEFT, padx=5)
+        frame.pack(pady=10)
 
         tk.Label(root, text="Results:").pack()
         self.log = scrolledtext.ScrolledText(root, width=70, height=30)
         self.log.pack()
+        self.report = RunReport("tie_check", log=self.log_message)
 
 
 
@@ -33,86 +51,42 @@ class TieCorrectionApp:
         self.log.see(tk.END)
 
     def parse_tie_entries(self, file_path):
+        # 流式读取每个 *tie 块中的所有数据行
+        errors = []
         try:
-            with open(file_path, "r") as f:
-                lines = [line.strip() for line in f.readlines()]
+            with self.report.stage("index", bytes=os.path.getsize(file_path)) as s:
+                index = load_keyword_index(file_path)
+                s.add(keywords=len(index.keywords))
+            with self.report.stage("parse") as s:
+                p = list(iter_tie_pairs(file_path, errors, index))
+                s.add(pairs=len(p), errors=len(errors))
         except Exception as e:
-            self.log_message(f"Error reading file: {str(e)}")
+            self.report.result(f"Error reading file: {str(e)}")
             return None
 
-        p = []
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            if line.startswith("*tie,"):
-                i += 1
-                while i < len(lines) and not lines[i]:
-                    i += 1
-                if i >= len(lines):
-                    break
-
-                next_line = lines[i]
-                if next_line.startswith("**"):
-                    i += 1
-                    continue
-                elif next_line.startswith("*") and not next_line.startswith("**"):
-                    self.log_message(f"Error: Unexpected keyword '{next_line}' after '*tie,' at line {i+1}")
-                    return None
-                else:
-                    # 分割 a 和 b，按第一个空格或逗号
-                    if " " in next_line:
-                        separator = " "
-                    elif "," in next_line:
-                        separator = ","
-                    else:
-                        self.log_message(f"Error: No space or comma found in line '{next_line}' at line {i+1}")
-                        return None
-
-                    parts = next_line.split(separator, 1)  # 分割成两部分
-                    a = parts[0].strip()
-                    b = parts[1].strip()  # 逗号或空格后的剩余内容
-                    p.append([a, b])
-                    i += 1
-            else:
-                i += 1
-
+        if errors:
+            for line_no, text in errors:
+                self.report.log(f"Error: No space or comma found in line '{text}' at line {line_no}")
+            return None
         return p
 
     def check_duplicates_and_swaps(self, p):
         if not p:
             return
 
-        self.log_message(f"Parsed *tie entries:\n{p}\n")
-
-        # 检查重复
-        seen = set()
-        duplicates = []
-        for i, (a, b) in enumerate(p):
-            entry = (a, b)
-            if entry in seen:
-                duplicates.append((i, a, b))
-            seen.add(entry)
-
-        if duplicates:
-            self.log_message("Found duplicate entries:")
-            for idx, a, b in duplicates:
-                self.log_message(f"Line {idx}: {a}, {b}")
-        else:
-            self.log_message("No duplicate entries found.")
-
-        # 检查交换
-        swaps = []
-        for i, (a1, b1) in enumerate(p):
-            for j, (a2, b2) in enumerate(p):
-                if i < j and a1 == b2 and b1 == a2:
-                    swaps.append((i, j, a1, b1))
-
-        if swaps:
-            self.log_message("Found swap phenomena:")
-            for i, j, a, b in swaps:
-                self.log_message(f"Line {i} ({a}, {b}) swaps with Line {j} ({b}, {a})")
-        else:
-            self.log_message("No swap phenomena found.")
+        # 一次遍历检查重复、交换和在多个 tie 中重复使用的面，结果按 tie 名字分组
+        with self.report.stage("check", pairs=len(p)):
+            messages = format_tie_report(find_tie_issues(p))
+        # 检查结果全部输出（一次插入），只有读取时的错误消息限流
+        if messages:
+            self.report.result("\n".join(messages))
+
+    def save_report(self, file_path):
+        try:
+            path = self.report.save(f"{os.path.splitext(file_path)[0]}_tie_report.json")
+            self.log_message(f"Run report saved as: {path}")
+        except OSError as e:
+            self.log_message(f"Could not save run report: {str(e)}")
 
     def run_check(self):
         self.log.delete(1.0, tk.END)
@@ -121,19 +95,60 @@ class TieCorrectionApp:
             messagebox.showerror("Error", "Please select a system model file!")
             return
 
-        self.log_message(f"Loading file: {file_path}")
+        # 各阶段耗时写入 <file>_tie_report.json；日志限流，大量问题时界面不会被拖慢
+        self.report = RunReport("tie_check", log=self.log_message)
+        self.report.result(f"Loading file: {file_path}")
         p = self.parse_tie_entries(file_path)
         if p is None:
+            self.save_report(file_path)
             messagebox.showerror("Error", "Failed to parse *tie entries. Check log for details.")
             return
 
-        self.log_message(f"Found {len(p)} *tie entries.")
+        self.report.result(f"Found {len(p)} *tie entries.")
         self.check_duplicates_and_swaps(p)
+        self.report.log_summary()
+        self.save_report(file_path)
         messagebox.showinfo("Success", "Check completed! See results in the log.")
 
+    def write_corrected(self):
+        self.log.delete(1.0, tk.END)
+        file_path = self.file_path.get()
+        if not file_path:
+            messagebox.showerror("Error", "Please select a system model file!")
+            return
+
+        self.report = RunReport("tie_correction", log=self.log_message)
+        log = self.report.result
+        log(f"Loading file: {file_path}")
+        errors = []
+        try:
+            with self.report.stage("index", bytes=os.path.getsize(file_path)) as s:
+                index = load_keyword_index(file_path)
+                s.add(keywords=len(index.keywords))
+            with self.report.stage("correct", bytes=os.path.getsize(file_path)) as s:
+                issues, removed, output_path = correct_tie_deck(file_path, errors=errors, index=index)
+                s.add(removed=removed)
+        except Exception as e:
+            log(f"Error writing corrected file: {str(e)}")
+            self.save_report(file_path)
+            messagebox.showerror("Error", "Failed to write the corrected file. Check log for details.")
+            return
+
+        for line_no, text in errors:
+            self.report.log(f"Warning: line {line_no} '{text}' has no space or comma and was copied unchanged")
+        messages = format_tie_report(issues)
+        if messages:
+            log("\n".join(messages))
+        log(f"Removed {removed} duplicate/swapped pairs.")
+        self.report.log_summary()
+        self.save_report(file_path)
+        messagebox.showinfo("Success", f"Corrected file written to {output_path}")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(check_main(sys.argv[1:]))
+    load_gui()
     root = tk.Tk()
     app = TieCorrectionApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from drop_generation import orientation_keywords, place_orientations
+from support_index import SupportIndex
+
+# place_orientations（一次算出所有方向）与原来 run_simulation 中逐个方向平移模型的循环结果一致
+
+
+def rotation_matrix(xn, yn, zn):
+    xn, yn, zn = np.radians(xn), np.radians(yn), np.radians(zn)
+    Rx = np.array([[1, 0, 0], [0, np.cos(xn), -np.sin(xn)], [0, np.sin(xn), np.cos(xn)]])
+    Ry = np.array([[np.cos(yn), 0, np.sin(yn)], [0, 1, 0], [-np.sin(yn), 0, np.cos(yn)]])
+    Rz = np.array([[np.cos(zn), -np.sin(zn), 0], [np.sin(zn), np.cos(zn), 0], [0, 0, 1]])
+    return Rz @ Ry @ Rx
+
+
+def baseline_placement(coords, p, drop_orientations, initial_velocity):
+    # 原 orientation-generations.py 中 "7. Process each orientation" 的循环（不写文件）
+    results = []
+    for angle in drop_orientations[:, 1:4]:
+        xn, yn, zn = angle
+        vn = rotation_matrix(xn, yn, zn) @ np.array([0, 0, 1])
+        relative_coords = coords - p
+        distances = np.dot(relative_coords, vn)
+        positive_distances = distances[distances > 0]
+        d = np.max(positive_distances) if len(positive_distances) > 0 else 0
+        displacement = (d + 0.0001) * vn
+        p_new = p + displacement
+        speed = np.array([initial_velocity * xn, initial_velocity * yn, initial_velocity * zn])
+        results.append({"angle": (xn, yn, zn), "p_new": p_new, "speed": speed})
+        p = p_new
+        coords = coords + displacement
+    return results
+
+
+def orientations(count, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.uniform(-1, 1, (count, 3))
+    rows[:6] = [[0, 0, 1], [0, 0, -1], [1, 0, 0], [0, 1, 0], [1, 1, 1], [0, 0, 0]][:min(count, 6)]
+    return np.column_stack([np.arange(1, count + 1), rows])
+
+
+def box_coords(count, seed=0):
+    rng = np.random.default_rng(seed)
+    coords = rng.random((count, 3)) * [150.0, 75.0, 8.0]
+    coords[::3, 2] = 0.0
+    return coords
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_placement_matches_per_orientation_loop(indexed):
+    coords = box_coords(5000)
+    drop_orientations = orientations(25)
+    p = coords.mean(axis=0) + [3.0, -2.0, 1.0]
+    index = SupportIndex.build(coords, center=coords.mean(axis=0)) if indexed else None
+    expected = baseline_placement(coords.copy(), p.copy(), drop_orientations, 5.42)
+    results = place_orientations(coords, p.copy(), drop_orientations, 5.42, index)
+    assert len(results) == len(expected)
+    for ori_id, result, base in zip(drop_orientations[:, 0].astype(int), results, expected):
+        assert result["angle"] == base["angle"]
+        np.testing.assert_allclose(result["p_new"], base["p_new"], rtol=1e-12, atol=1e-9)
+        np.testing.assert_array_equal(result["speed"], base["speed"])
+        # 写入文件的内容（6 位小数）相同
+        assert orientation_keywords(ori_id, result, 80.0) == orientation_keywords(ori_id, base, 80.0)
+
+
+def test_placement_when_no_node_is_ahead_of_the_ground():
+    # 所有节点都在法向负侧时 d = 0，只移动 0.0001
+    coords = box_coords(100) - [200.0, 200.0, 200.0]
+    drop_orientations = np.array([[1, 0.0, 0.0, 0.0]])
+    p = np.zeros(3)
+    expected = baseline_placement(coords, p, drop_orientations, 1.0)
+    results = place_orientations(coords, p, drop_orientations, 1.0)
+    np.testing.assert_allclose(results[0]["p_new"], expected[0]["p_new"])
+    np.testing.assert_allclose(results[0]["p_new"], [0, 0, 0.0001])
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from keyword_index import KeywordIndex
+from system_model import read_nodes
+
+# read_nodes 与原来 read_system_model 逐行解析的结果必须一致（节点和跳过的行）
+
+
+def baseline_nodes(file_path):
+    # 原 orientation-generations.py 中 read_system_model 的规则，日志换成跳过原因
+    with open(file_path, "r") as f:
+        lines = f.readlines()
+    system_model = []
+    skipped = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.startswith("*node"):
+            i += 1
+            while i < len(lines):
+                next_line = lines[i].strip()
+                if next_line.startswith("**"):
+                    i += 1
+                    continue
+                if next_line.startswith("*") and not next_line.startswith("*node"):
+                    break
+                if next_line and next_line[0].isdigit():
+                    parts = next_line.replace(",", " ").split()
+                    if len(parts) == 4:
+                        try:
+                            values = [float(parts[0])] + [float(x) for x in parts[1:]]
+                            if all(c.isdigit() or c in "., -" for c in next_line):
+                                system_model.append(values)
+                            else:
+                                skipped.append("unexpected characters")
+                        except ValueError:
+                            skipped.append("non-numeric")
+                    else:
+                        skipped.append("wrong number of values")
+                i += 1
+        else:
+            i += 1
+    return np.array(system_model, dtype=np.float64).reshape(-1, 4), skipped
+
+
+EDGE_LINES = [
+    "1, 1.0, 2.0, 3.0",
+    "2 1 2 3",
+    "3,-1.5,2,-3",
+    "  4 , 0.5 , -0.25 , 7.",
+    "5, 1, 2, 3,",
+    "6, .5, -.5, 0",
+    "1-2, 1, 2, 3",
+    "7, 1.2.3, 1, 2",
+    "8, -, 1, 2",
+    "9, ., 1, 2",
+    "10, 1-, 2, 3",
+    "11, 1e3, 2, 3",
+    "12\t1\t2\t3",
+    "13, 1, 2",
+    "14, 1, 2, 3, 4",
+    "15,,1,2",
+    "16, --1, 2, 3",
+    ", 17, 1, 2, 3",
+    "-18, 1, 2, 3",
+    ".19, 1, 2, 3",
+    "20, 1, 2, 3 ** comment",
+    "21, 1.5, 2.5, 3.5",
+    "",
+    "   ",
+    "** comment line",
+    "22, 0, 0, 0",
+]
+
+
+def write_deck(path, lines, newline="\n"):
+    with open(path, "w", newline="") as f:
+        f.write(newline.join(lines) + newline)
+
+
+def deck_lines(data_lines):
+    return (["*heading", "edge cases", "1, 9, 9, 9", "*node, nset=all"] + data_lines
+            + ["*element, type=C3D8R", "23, 1, 2, 3", "*node", "24, 4, 5, 6", "*nodeset, nset=x", "25, 1, 1, 1",
+               "*NODE", "26, 1, 1, 1", "*end step"])
+
+
+def assert_same(path, **kwargs):
+    expected, skipped = baseline_nodes(path)
+    nodes, report = read_nodes(path, **kwargs)
+    np.testing.assert_array_equal(np.asarray(nodes), expected)
+    for reason in set(report["skipped"]) | set(skipped):
+        assert report["skipped"].get(reason, 0) == skipped.count(reason), reason
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+@pytest.mark.parametrize("chunk_size", [7, 64, 16 * 1024 * 1024])
+def test_edge_lines_match_baseline(tmp_path, newline, chunk_size):
+    path = str(tmp_path / "deck.inp")
+    write_deck(path, deck_lines(EDGE_LINES), newline)
+    assert_same(path, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_keyword_index_path_matches_baseline(tmp_path, newline):
+    path = str(tmp_path / "deck.inp")
+    write_deck(path, deck_lines(EDGE_LINES), newline)
+    assert_same(path, index=KeywordIndex.build(path), chunk_size=64)
+
+
+def test_random_lines_match_baseline(tmp_path):
+    rng = np.random.default_rng(0)
+    tokens = ["1", "23", "-4", "5.5", "-.5", ".", "-", "1.2.3", "1e3", "7-", "x", "", "0"]
+    separators = [", ", ",", " ", "  ", ",,", "\t", " , "]
+    lines = []
+    for _ in range(3000):
+        count = rng.integers(1, 7)
+        parts = [str(rng.integers(1, 100000))] if rng.random() < 0.8 else [tokens[rng.integers(len(tokens))]]
+        for _ in range(count - 1):
+            if rng.random() < 0.2:
+                parts.append(tokens[rng.integers(len(tokens))])
+            else:
+                parts.append(f"{rng.normal() * 100:.{rng.integers(0, 7)}f}")
+        line = parts[0]
+        for part in parts[1:]:
+            line += separators[rng.integers(len(separators))] + part
+        if rng.random() < 0.05:
+            line = "** " + line
+        lines.append(" " * int(rng.integers(0, 3)) + line)
+    path = str(tmp_path / "random.inp")
+    write_deck(path, deck_lines(lines))
+    for chunk_size in (97, 4096):
+        assert_same(path, chunk_size=chunk_size)
+    assert_same(path, index=KeywordIndex.build(path))
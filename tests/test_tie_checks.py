@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from keyword_index import KeywordIndex
+from tie_checks import correct_tie_deck, find_tie_issues, iter_tie_pairs
+
+# correct_tie_deck 按字节范围删除行，与逐行在内存中修正的结果一致；修正后的文件再次检查时没有重复和交换
+
+
+def reference_correction(text):
+    # 同名 tie 中重复或交换的对删除；某个 *tie 块的所有对都被删除时整块（关键字行到最后一个数据行）删除
+    lines = text.splitlines(keepends=True)
+    seen = {}
+    drop = set()
+    blocks = []
+    name = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("*") and not stripped.startswith("**"):
+            lower = stripped.lower()
+            name = None
+            if lower.startswith("*tie") and (len(lower) == 4 or lower[4:].lstrip().startswith(",")):
+                name = stripped.split("name=")[1].split(",")[0].strip() if "name=" in stripped else ""
+                blocks.append((i, []))
+            continue
+        if name is None or not stripped or stripped.startswith("**"):
+            continue
+        a, b = stripped.replace(",", " ").split()[:2]
+        key = (name, min(a, b), max(a, b))
+        blocks[-1][1].append(i)
+        if key in seen:
+            drop.add(i)
+        else:
+            seen[key] = i
+    for start, rows in blocks:
+        if rows and all(i in drop for i in rows):
+            drop.update(range(start, rows[-1] + 1))
+    return "".join(line for i, line in enumerate(lines) if i not in drop)
+
+
+def random_deck(seed):
+    rng = np.random.default_rng(seed)
+    surfaces = [f"s{i}" for i in range(12)]
+    out = ["*heading", "random tie deck", "*node", "1, 0, 0, 0"]
+    for _ in range(rng.integers(3, 9)):
+        name = f"t{rng.integers(0, 3)}"
+        params = ", adjust=no" if rng.random() < 0.5 else ""
+        out.append(f"*tie, name={name}{params}")
+        for _ in range(rng.integers(1, 6)):
+            if rng.random() < 0.15:
+                out.append("** comment")
+            a, b = rng.choice(surfaces, 2, replace=False)
+            out.append(f"{a}{[', ', ',', ' '][rng.integers(3)]}{b}")
+    out.append("*end step")
+    return "\n".join(out) + "\n"
+
+
+def check_clean(path, index=None):
+    issues = find_tie_issues(iter_tie_pairs(path, index=index))
+    return all(not group["duplicates"] and not group["swaps"] for group in issues["ties"].values())
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_corrected_deck_round_trip(tmp_path, use_index):
+    for seed in range(200):
+        text = random_deck(seed)
+        path = tmp_path / f"deck_{seed}.inp"
+        path.write_text(text)
+        output = tmp_path / f"deck_{seed}_fixed.inp"
+        index = KeywordIndex.build(str(path)) if use_index else None
+        issues, removed, _ = correct_tie_deck(str(path), str(output), index=index)
+        assert output.read_text() == reference_correction(text), seed
+        found = sum(len(g["duplicates"]) + len(g["swaps"]) for g in issues["ties"].values())
+        assert removed == found
+        assert check_clean(str(output))
+
+
+def test_repeats_across_ties_are_kept(tmp_path):
+    path = tmp_path / "deck.inp"
+    path.write_text("*tie, name=t1\na,b\n*tie, name=t2, adjust=no\nb, a\n")
+    issues, removed, output = correct_tie_deck(str(path))
+    assert removed == 0
+    assert open(output).read() == path.read_text()
+    assert [(pair.line, first.line) for pair, first in issues["repeated_pairs"]] == [(4, 2)]
+
+
+def test_redundant_block_is_removed(tmp_path):
+    path = tmp_path / "deck.inp"
+    path.write_text("*tie, name=t1\na,b\nc, d\n*tie, name=t1\n** again\nd,c\nb a\n*end step\n")
+    issues, removed, output = correct_tie_deck(str(path))
+    assert removed == 2
+    assert open(output).read() == "*tie, name=t1\na,b\nc, d\n*end step\n"
+    assert issues["removed_blocks"] == [("t1", 6, 7)]
+    assert check_clean(output)